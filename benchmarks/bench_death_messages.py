@@ -0,0 +1,121 @@
+"""
+Throughput benchmark for the death message matcher.
+
+Compares the compiled single-pass matcher in monitoring/death_messages.py
+against the previous implementation, which rebuilt one pattern per template
+and called re.match on each of them for every line.
+
+Usage: python benchmarks/bench_death_messages.py [--lines N]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from monitoring import death_messages  # noqa: E402
+
+
+def legacy_create_regex_pattern(death_msg):
+    """Previous pattern builder, kept verbatim (literal text was not escaped)."""
+    pattern = death_msg.replace("<player>", death_messages.PLAYER_PATTERN)
+    pattern = pattern.replace("<player/mob>", death_messages.ENTITY_PATTERN)
+    pattern = pattern.replace("<item>", death_messages.ITEM_PATTERN)
+    return f"^{pattern}$"
+
+
+def legacy_is_death_message(message):
+    """Previous implementation: one re.match per template, pattern rebuilt each time."""
+    message = message.strip()
+    for death_msg in death_messages.ALL_DEATH_MESSAGES:
+        pattern = legacy_create_regex_pattern(death_msg)
+        if re.match(pattern, message):
+            return True
+    return False
+
+
+def legacy_get_death_message_category(message):
+    """Previous implementation of the category lookup, scanning templates again."""
+    for category, messages in death_messages.MINECRAFT_DEATH_MESSAGES.items():
+        for death_msg in messages:
+            pattern = legacy_create_regex_pattern(death_msg)
+            if re.match(pattern, message):
+                return category
+    return None
+
+
+def legacy_match(message):
+    if legacy_is_death_message(message):
+        return legacy_get_death_message_category(message)
+    return None
+
+
+def new_match(message):
+    death = death_messages.match_death_message(message)
+    return death.category if death else None
+
+
+def generate_lines(count, death_ratio=0.1, seed=1234):
+    """Build a mix of chat/join lines and death messages, like a busy server."""
+    rng = random.Random(seed)
+    chatter = [
+        "<{player}> anyone got spare iron?",
+        "<{player}> brb",
+        "{player} joined the game",
+        "{player} left the game",
+        "{player} has made the advancement [Stone Age]",
+        "Saving the game (this may take a moment!)",
+    ]
+    lines = []
+    for _ in range(count):
+        player = rng.choice(death_messages.COMMON_PLAYER_NAMES)
+        if rng.random() < death_ratio:
+            template = rng.choice(death_messages.ALL_DEATH_MESSAGES)
+            line = (
+                template.replace("<player>", player)
+                .replace("<player/mob>", rng.choice(death_messages.COMMON_MOB_NAMES))
+                .replace("<item>", rng.choice(death_messages.COMMON_ITEMS))
+            )
+        else:
+            line = rng.choice(chatter).format(player=player)
+        lines.append(line)
+    return lines
+
+
+def run(name, matcher, lines):
+    start = time.perf_counter()
+    results = [matcher(line) for line in lines]
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>8}: {len(lines) / elapsed:>12,.0f} lines/s "
+        f"({elapsed * 1e6 / len(lines):.2f} µs/line)"
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--death-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines, args.death_ratio)
+    legacy = run("legacy", legacy_match, lines)
+    compiled = run("compiled", new_match, lines)
+
+    mismatches = [
+        (line, old, new)
+        for line, old, new in zip(lines, legacy, compiled)
+        if (old is None) != (new is None)
+    ]
+    print(f"detection mismatches: {len(mismatches)}")
+    for line, old, new in mismatches[:5]:
+        print(f"  {line!r}: legacy={old} compiled={new}")
+
+
+if __name__ == "__main__":
+    main()
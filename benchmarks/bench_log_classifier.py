@@ -0,0 +1,123 @@
+"""
+Microbenchmark of the log classifier against the if/elif chain it replaced.
+
+Classifies the messages of a synthetic traffic mix (see log_generator.py)
+with both and reports the nanoseconds per line of each kind of message, the
+agreement with the generator's tags, and the lines each one gets wrong:
+
+    python benchmarks/bench_log_classifier.py --lines 20000 --flavor paper
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from log_generator import FLAVORS, LogGenerator  # noqa: E402
+from monitoring import death_messages  # noqa: E402
+from monitoring.log_classifier import LogClassifier  # noqa: E402
+from monitoring.log_records import LogRecordParser  # noqa: E402
+
+
+def legacy_classify(message):
+    """The substring checks LogMonitor.process_log_line used to run"""
+    if "joined the game" in message:
+        return "join"
+    if "left the game" in message:
+        return "leave"
+    if not death_messages.is_death_message(message) and message.startswith("<") and ">" in message:
+        return "chat"
+    if "Done (" in message and "For help, type" in message:
+        return "ready"
+    if death_messages.is_death_message(message):
+        return "death"
+    return None
+
+
+def traffic(flavor, count, seed):
+    generator = LogGenerator(flavor, seed=seed)
+    lines = generator.mixed(count, chat=0.3, death=0.05, presence=0.05)
+    lines += generator.boot(max(1, count // 20))
+    # Chat quoting other events, which substring checks get wrong
+    for _ in range(max(1, count // 100)):
+        player = generator.player()
+        lines.append(generator.chat(message=f"{player} joined the game"))
+        lines.append(generator.chat(message=f"{player} left the game lol"))
+    generator.rng.shuffle(lines)
+    parser = LogRecordParser()
+    return [(parser.parse_line(line).message, event) for line, event in lines]
+
+
+def measure(classify, messages, repeat):
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter_ns()
+        for message in messages:
+            classify(message)
+        elapsed = time.perf_counter_ns() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / len(messages), 1)
+
+
+def bench(name, classify, traffic, repeat):
+    by_event = {}
+    for message, event in traffic:
+        by_event.setdefault(event or "none", []).append(message)
+
+    mismatches = {}
+    for message, event in traffic:
+        got = classify(message)
+        if got != event:
+            key = f"{event} -> {got}"
+            mismatches[key] = mismatches.get(key, 0) + 1
+
+    return {
+        "classifier": name,
+        "ns_per_line": measure(classify, [message for message, _ in traffic], repeat),
+        "ns_per_line_by_event": {
+            event: measure(classify, messages, repeat)
+            for event, messages in sorted(by_event.items())
+        },
+        "accuracy": round(1 - sum(mismatches.values()) / len(traffic), 4),
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--flavor", choices=FLAVORS, default="vanilla")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    messages = traffic(args.flavor, args.lines, args.seed)
+    classifier = LogClassifier()
+
+    def classify(message):
+        event = classifier.classify(message)
+        # Lag warnings are classified but not posted, like the generator tags
+        return event.kind if event is not None and event.kind != "lag" else None
+
+    results = [
+        bench("legacy", legacy_classify, messages, args.repeat),
+        bench("rules", classify, messages, args.repeat),
+    ]
+    output = json.dumps(
+        {"flavor": args.flavor, "lines": len(messages), "results": results}, indent=2
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
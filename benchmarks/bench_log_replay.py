@@ -0,0 +1,316 @@
+"""
+End-to-end replay benchmark of the LogMonitor pipeline.
+
+Writes synthetic vanilla/Paper/Forge traffic (boot flood, chat bursts, mass
+deaths, rotation) to a temporary latest.log while a real LogMonitor follows
+it and sends through a real Messager to a fake Discord channel. Reports
+lines per second, per-event latency from the write to the Discord call and
+memory use, as JSON so runs can be compared.
+
+`lines_per_second` is wall clock, so it is bounded by the pacing of the
+bursty scenarios; `lines_per_busy_second` only counts time spent handling
+lines and is the one to watch for parsing regressions.
+
+With `--workers N`, tailing and classification run in log worker processes
+and the busy time is what is left on the bot's event loop: handling the
+classified events the workers send back.
+
+Usage:
+    python benchmarks/bench_log_replay.py [--output results.json]
+    python benchmarks/bench_log_replay.py --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from log_generator import FLAVORS, LogGenerator, scenarios  # noqa: E402
+from log_workers import LogWorkerPool  # noqa: E402
+from messager import Messager  # noqa: E402
+from monitoring.checkpoint_store import CheckpointStore  # noqa: E402
+from monitoring.log_monitor import LogMonitor  # noqa: E402
+
+STARTUP_TITLE = "Le serveur démarre"
+# Events LogMonitor posts to Discord, the others are only logged
+POSTED_EVENTS = ("join", "leave", "chat", "death", "ready")
+
+
+class FakeMessage:
+    def __init__(self, channel, embed):
+        self.channel = channel
+        self.embeds = [embed]
+
+    async def edit(self, embed=None, content=None):
+        await asyncio.sleep(self.channel.latency)
+        self.channel.record(embed)
+
+
+class FakeChannel:
+    """Discord channel stand-in recording when each embed reached "Discord"."""
+
+    def __init__(self, latency):
+        self.id = 1
+        self.latency = latency
+        self.deliveries = []
+        self.startup_updates = 0
+
+    def record(self, embed):
+        if embed is not None and (embed.title or "").startswith(STARTUP_TITLE):
+            self.startup_updates += 1
+            return
+        self.deliveries.append(time.perf_counter())
+
+    async def send(self, content=None, embed=None):
+        await asyncio.sleep(self.latency)
+        self.record(embed)
+        return FakeMessage(self, embed)
+
+
+class FakeDockerMonitor:
+    def __init__(self, waiting_for_startup):
+        self.waiting_for_startup = waiting_for_startup
+        self.started_at = time.monotonic()
+
+    def startup_elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def notify_server_ready(self):
+        self.waiting_for_startup = False
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_scenario(name, flavor, scenario, args, log_workers=None):
+    directory = tempfile.mkdtemp(prefix="bench-log-replay-")
+    log_file = os.path.join(directory, "latest.log")
+    open(log_file, "w").close()
+
+    channel = FakeChannel(args.discord_latency)
+    messager = Messager(channel, edit_interval=args.edit_interval)
+    ready = asyncio.Event()
+    monitor = LogMonitor(
+        args.edit_interval,
+        log_file,
+        channel,
+        FakeDockerMonitor(scenario["waiting_for_startup"]),
+        f"{flavor}-{name}",
+        "bench",
+        ready,
+        messager,
+        catchup_max_lines=10**6,
+        log_workers=log_workers,
+    )
+    monitor.checkpoint_store = CheckpointStore(monitor.friendly_name, directory)
+
+    processed = {"lines": 0, "last_at": None, "busy": 0.0}
+    handle_log_lines = monitor.handle_log_lines
+    handle_worker_message = monitor.handle_worker_message
+
+    async def counted(lines):
+        started_at = time.perf_counter()
+        await handle_log_lines(lines)
+        processed["last_at"] = time.perf_counter()
+        processed["busy"] += processed["last_at"] - started_at
+        processed["lines"] += len(lines)
+
+    async def counted_message(message):
+        started_at = time.perf_counter()
+        await handle_worker_message(message)
+        if message["op"] == "batch":
+            processed["last_at"] = time.perf_counter()
+            processed["busy"] += processed["last_at"] - started_at
+            processed["lines"] += message["lines"]
+
+    monitor.handle_log_lines = counted
+    monitor.handle_worker_message = counted_message
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.trace_memory:
+        tracemalloc.start()
+
+    task = asyncio.create_task(monitor.start_monitoring())
+    await ready.wait()
+
+    written_at = []
+    total_lines = 0
+    first_write = None
+    fd = os.open(log_file, os.O_WRONLY | os.O_APPEND)
+    try:
+        for step in scenario["steps"]:
+            if step[0] == "sleep":
+                await asyncio.sleep(step[1])
+            elif step[0] == "rotate":
+                os.close(fd)
+                os.rename(log_file, os.path.join(directory, "previous.log"))
+                fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            else:
+                lines = step[1]
+                data = "".join(f"{line}\n" for line, _ in lines).encode()
+                now = time.perf_counter()
+                first_write = first_write or now
+                os.write(fd, data)
+                total_lines += len(lines)
+                written_at.extend(now for _, event in lines if event in POSTED_EVENTS)
+                # Yield so the monitor can interleave with the writer
+                await asyncio.sleep(0)
+    finally:
+        os.close(fd)
+
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline and (
+        len(channel.deliveries) < len(written_at) or processed["lines"] < total_lines
+    ):
+        await asyncio.sleep(0.01)
+
+    monitor.stop_monitoring()
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    traced_peak = None
+    if args.trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    # Critical events go through one FIFO queue, so the n-th delivery is the
+    # n-th event written
+    latencies = [
+        delivered - written
+        for written, delivered in zip(written_at, channel.deliveries)
+    ]
+    elapsed = (processed["last_at"] or time.perf_counter()) - first_write
+    return {
+        "flavor": flavor,
+        "scenario": name,
+        "lines": total_lines,
+        "lines_processed": processed["lines"],
+        "events_expected": len(written_at),
+        "events_delivered": len(channel.deliveries),
+        "startup_updates": channel.startup_updates,
+        "lines_per_second": round(processed["lines"] / elapsed, 1) if elapsed > 0 else None,
+        "lines_per_busy_second": round(processed["lines"] / processed["busy"], 1)
+        if processed["busy"] > 0
+        else None,
+        "latency_seconds": {
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies, default=None),
+        },
+        "memory": {
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "max_rss_growth_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            - rss_before,
+            "traced_peak_bytes": traced_peak,
+        },
+        "queue": monitor.event_queue.stats(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, max_regression):
+    """Print throughput/latency changes against a baseline, return regressions"""
+    previous = {(r["flavor"], r["scenario"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        key = (result["flavor"], result["scenario"])
+        old = previous.get(key)
+        if not old or not old["lines_per_busy_second"] or not result["lines_per_busy_second"]:
+            continue
+        change = result["lines_per_busy_second"] / old["lines_per_busy_second"] - 1
+        p99, old_p99 = result["latency_seconds"]["p99"], old["latency_seconds"]["p99"]
+        latency = f"p99 {old_p99 * 1000:.1f} -> {p99 * 1000:.1f} ms" if p99 and old_p99 else ""
+        print(f"{key[0]:>8} {key[1]:<12} {change:+7.1%} lines/busy s  {latency}")
+        if change < -max_regression:
+            regressions.append(key)
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--flavor", choices=FLAVORS, action="append")
+    parser.add_argument("--scenario", action="append")
+    parser.add_argument("--scale", type=float, default=1.0, help="scenario size multiplier")
+    parser.add_argument("--discord-latency", type=float, default=0.0)
+    parser.add_argument("--edit-interval", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc peak (slower)")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=0, help="log worker processes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "workers": args.workers,
+        "results": [],
+    }
+    log_workers = LogWorkerPool(args.workers) if args.workers else None
+    for flavor in args.flavor or FLAVORS:
+        for name, scenario in scenarios(LogGenerator(flavor), args.scale).items():
+            if args.scenario and name not in args.scenario:
+                continue
+            result = await run_scenario(name, flavor, scenario, args, log_workers)
+            results["results"].append(result)
+            print(
+                f"{flavor:>8} {name:<12} {result['lines_per_busy_second'] or 0:>10,.0f} lines/busy s  "
+                f"events {result['events_delivered']}/{result['events_expected']}  "
+                f"p99 {(result['latency_seconds']['p99'] or 0) * 1000:.1f} ms",
+                file=sys.stderr,
+            )
+    if log_workers:
+        await log_workers.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.max_regression)
+        if regressions:
+            print(f"Throughput regressed by more than {args.max_regression:.0%}: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
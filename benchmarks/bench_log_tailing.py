@@ -0,0 +1,191 @@
+"""
+CPU cost of following many log files, per tailer or through the shared
+LogReader.
+
+For each file count, every mode follows that many `latest.log` files (one
+directory per server, like the containers' volumes) for `--duration`
+seconds while idle, then while a writer appends `--rate` lines per second
+spread over the files. Reported: CPU seconds per wall second, event loop
+wakeups, and the lines received against the lines written.
+
+Modes:
+    per-file     one LogTailer each with its own inotify, the previous setup
+    shared       one LogReader with a single inotify for every file
+    shared-poll  one LogReader sweeping every file with batched stats
+
+    python benchmarks/bench_log_tailing.py --files 10 100 500 --duration 5
+
+Each tailer needs its own inotify instance in per-file mode; past the
+kernel's fs.inotify.max_user_instances (128 by default) the others fall
+back to polling, which the results show as "inotify_tailers".
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import selectors
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from monitoring.log_reader import LogReader  # noqa: E402
+from monitoring.log_tailer import LogTailer  # noqa: E402
+
+MODES = ("per-file", "shared", "shared-poll")
+
+
+class CountingSelector(selectors.DefaultSelector):
+    """Counts the event loop's wakeups"""
+
+    wakeups = 0
+
+    def select(self, timeout=None):
+        events = super().select(timeout)
+        self.wakeups += 1
+        return events
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+async def measure(duration, write=None):
+    loop = asyncio.get_running_loop()
+    selector = loop._selector
+    wakeups = selector.wakeups
+    cpu = cpu_seconds()
+    started_at = time.monotonic()
+    writer = asyncio.create_task(write(duration)) if write else None
+    await asyncio.sleep(duration)
+    if writer:
+        await writer
+    elapsed = time.monotonic() - started_at
+    return {
+        "cpu_per_second": round((cpu_seconds() - cpu) / elapsed, 4),
+        "wakeups_per_second": round((selector.wakeups - wakeups) / elapsed, 1),
+    }
+
+
+async def run_mode(mode, count, args, directory):
+    paths = []
+    for index in range(count):
+        logs = os.path.join(directory, f"server{index}", "logs")
+        os.makedirs(logs)
+        path = os.path.join(logs, "latest.log")
+        open(path, "w").close()
+        paths.append(path)
+
+    reader = None
+    if mode != "per-file":
+        reader = LogReader(use_inotify=mode == "shared", sweep_interval=args.sweep_interval)
+
+    received = [0]
+    tailers = [LogTailer(path, reader=reader) for path in paths]
+
+    async def follow(tailer):
+        tailer.open()
+        try:
+            async for lines in tailer.follow():
+                received[0] += len(lines)
+        finally:
+            tailer.close()
+
+    tasks = [asyncio.create_task(follow(tailer)) for tailer in tailers]
+    await asyncio.sleep(0.5)
+
+    idle = await measure(args.duration)
+
+    descriptors = [os.open(path, os.O_WRONLY | os.O_APPEND) for path in paths]
+    written = [0]
+    rng = random.Random(1234)
+
+    async def write(duration):
+        deadline = time.monotonic() + duration
+        step = 0.05
+        per_step = max(1, int(args.rate * step))
+        while time.monotonic() < deadline:
+            for _ in range(per_step):
+                os.write(
+                    rng.choice(descriptors),
+                    b"[12:00:00] [Server thread/INFO]: Saving the game\n",
+                )
+            written[0] += per_step
+            await asyncio.sleep(step)
+
+    received[0] = 0
+    active = await measure(args.duration, write)
+    # Let the last writes and a sweep come through
+    deadline = time.monotonic() + args.sweep_interval + 2
+    while received[0] < written[0] and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    active["lines_written"] = written[0]
+    active["lines_received"] = received[0]
+
+    result = {
+        "mode": mode,
+        "files": count,
+        "inotify_tailers": sum(1 for tailer in tailers if tailer._inotify),
+        "idle": idle,
+        "active": active,
+    }
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for descriptor in descriptors:
+        os.close(descriptor)
+    if reader:
+        result["reader"] = {"wakeups": reader.wakeups, "sweeps": reader.sweeps}
+        reader.stop()
+    return result
+
+
+async def main(args):
+    results = []
+    for count in args.files:
+        for mode in args.mode or MODES:
+            with tempfile.TemporaryDirectory() as directory:
+                result = await run_mode(mode, count, args, directory)
+            results.append(result)
+            print(
+                f"{mode:>11} {count:>4} files  idle {result['idle']['cpu_per_second']:.3f} cpu/s "
+                f"{result['idle']['wakeups_per_second']:>7.1f} wakeups/s  "
+                f"active {result['active']['cpu_per_second']:.3f} cpu/s "
+                f"lines {result['active']['lines_received']}/{result['active']['lines_written']}",
+                file=sys.stderr,
+            )
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--mode", choices=MODES, action="append")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--rate", type=int, default=1000, help="lines per second, all files")
+    parser.add_argument("--sweep-interval", type=float, default=10.0)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    logging.basicConfig(level=logging.ERROR)
+    loop = asyncio.SelectorEventLoop(CountingSelector())
+    try:
+        results = loop.run_until_complete(main(args))
+    finally:
+        loop.close()
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
@@ -0,0 +1,129 @@
+"""
+Load benchmark of RCONClient against the in-repo fake RCON server.
+
+Fires `--requests` calls of `send_command_wrapper`, `--concurrency` at a
+time, and reports throughput, p50/p90/p99 latency and error counts. The
+fault injection options of fake_rcon_server.py apply, e.g.:
+
+    python benchmarks/bench_rcon_load.py --latency 0.005 --concurrency 50
+    python benchmarks/bench_rcon_load.py --command "payload 20000" --write-chunk 512
+    python benchmarks/bench_rcon_load.py --drop-rate 0.01 --pool-size 4
+
+Pass --host/--port to load a real server instead (its password with
+--password).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_rcon_server import add_server_arguments, server_from_arguments  # noqa: E402
+from rcon_cache import RCONResponseCache  # noqa: E402
+from rcon_client import RCONClient  # noqa: E402
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_load(client, command, requests, concurrency):
+    latencies = []
+    errors = {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started_at = time.perf_counter()
+            response = await client.send_command_wrapper(command=command)
+            if response.startswith("❌"):
+                errors[response] = errors.get(response, 0) + 1
+            else:
+                latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        "requests": requests,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            name: round(value * 1000, 3) if value is not None else None
+            for name, value in (
+                ("p50", percentile(latencies, 0.50)),
+                ("p90", percentile(latencies, 0.90)),
+                ("p99", percentile(latencies, 0.99)),
+                ("max", max(latencies, default=None)),
+            )
+        },
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", help="benchmark a running server instead of the fake one")
+    parser.add_argument("--port", type=int, default=25575)
+    parser.add_argument("--command", default="list")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--command-timeout", type=float, default=10)
+    parser.add_argument("--cache", action="store_true", help="enable the response cache")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    server = None
+    host, port = args.host, args.port
+    if host is None:
+        server = await server_from_arguments(args, seed=1234).start()
+        host, port = server.host, server.port
+
+    client = RCONClient(
+        host,
+        port,
+        args.password,
+        pool_size=args.pool_size,
+        command_timeout=args.command_timeout,
+        cache=RCONResponseCache() if args.cache else None,
+    )
+    try:
+        result = await run_load(client, args.command, args.requests, args.concurrency)
+    finally:
+        client.close()
+        if server:
+            await server.stop()
+
+    result.update(
+        {
+            "command": args.command,
+            "concurrency": args.concurrency,
+            "pool_size": args.pool_size,
+            "server": server.stats() if server else None,
+        }
+    )
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,303 @@
+"""
+Stand-in for the Docker Engine API, for tests and manual runs of the bot
+against containers that don't exist.
+
+Serves over TCP the few endpoints DockerClient uses: the event stream,
+container inspect (404 for an unknown container, like the daemon),
+restart and stop with their `t` grace period, and the log stream. Logs are
+multiplexed in 8-byte framed writes unless the container has a TTY, and
+like the daemon, messages longer than 16 KB are split over several frames,
+each starting with its own timestamp. `since` and `tail` are honoured, and
+`follow` keeps the stream open until the container stops.
+
+Usage: python benchmarks/fake_docker_server.py [--port 2375] [--container mc]
+Then point the bot at it with DOCKER_HOST=tcp://127.0.0.1:2375.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import struct
+import time
+import uuid
+
+from aiohttp import web
+
+# Docker's log driver cuts messages at 16 KB
+MAX_MESSAGE = 16 * 1024
+
+
+def rfc3339(nanos):
+    seconds, fraction = divmod(nanos, 1_000_000_000)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{fraction:09d}Z"
+
+
+def parse_since(value):
+    """`since` of the API, seconds with an optional fraction, as nanoseconds"""
+    if value is None:
+        return None
+    seconds, _, fraction = value.partition(".")
+    return int(seconds) * 1_000_000_000 + int(fraction[:9].ljust(9, "0") or 0)
+
+
+class FakeContainer:
+    def __init__(self, name, tty=False, running=True):
+        self.name = name
+        self.id = uuid.uuid4().hex + uuid.uuid4().hex
+        self.tty = tty
+        self.running = running
+        self.starts = 0
+        # (timestamp in nanoseconds, stream, bytes), one entry per message
+        self.logs = []
+        self.changed = asyncio.Condition()
+
+    def inspect(self):
+        return {
+            "Id": self.id,
+            "Name": f"/{self.name}",
+            "Config": {"Tty": self.tty},
+            "State": {
+                "Status": "running" if self.running else "exited",
+                "Running": self.running,
+            },
+        }
+
+
+class FakeDockerServer:
+    def __init__(self, host="127.0.0.1", port=0, api_version="v1.41"):
+        self.host = host
+        self.port = port
+        self.api_version = api_version
+        self.containers = {}
+        self.events = []
+        self._subscribers = set()
+        self._streams = set()
+        self._runner = None
+        self._clock = 0
+
+        self.restarts = []
+        self.stops = []
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return f"tcp://{self.host}:{self.port}"
+
+    def add_container(self, name, tty=False, running=True):
+        container = FakeContainer(name, tty=tty, running=running)
+        self.containers[name] = container
+        return container
+
+    def now(self):
+        """Wall clock in nanoseconds, strictly increasing"""
+        self._clock = max(self._clock + 1, time.time_ns())
+        return self._clock
+
+    async def write_log(self, name, line, stream=1):
+        """Append a line to a container's output, waking followers"""
+        container = self.containers[name]
+        data = line.encode("utf-8") + b"\n"
+        for start in range(0, len(data), MAX_MESSAGE):
+            container.logs.append((self.now(), stream, data[start : start + MAX_MESSAGE]))
+        async with container.changed:
+            container.changed.notify_all()
+
+    async def set_running(self, name, running):
+        """Start or stop a container and publish the matching event"""
+        container = self.containers[name]
+        container.running = running
+        if running:
+            container.starts += 1
+        self.emit(container, "start" if running else "die")
+        async with container.changed:
+            container.changed.notify_all()
+
+    def emit(self, container, action):
+        nanos = self.now()
+        event = {
+            "Type": "container",
+            "Action": action,
+            "Actor": {"ID": container.id, "Attributes": {"name": container.name}},
+            "time": nanos // 1_000_000_000,
+            "timeNano": nanos,
+        }
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    async def start(self):
+        app = web.Application(middlewares=[self._track])
+        prefix = f"/{self.api_version}"
+        app.router.add_get(f"{prefix}/events", self._events)
+        app.router.add_get(f"{prefix}/containers/{{name}}/json", self._inspect)
+        app.router.add_post(f"{prefix}/containers/{{name}}/restart", self._restart)
+        app.router.add_post(f"{prefix}/containers/{{name}}/stop", self._stop)
+        app.router.add_get(f"{prefix}/containers/{{name}}/logs", self._logs)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is None:
+            return
+        # Open streams would hold the shutdown until its timeout
+        for task in self._streams:
+            task.cancel()
+        await self._runner.cleanup()
+        self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    @web.middleware
+    async def _track(self, request, handler):
+        self.requests += 1
+        task = asyncio.current_task()
+        self._streams.add(task)
+        try:
+            return await handler(request)
+        finally:
+            self._streams.discard(task)
+
+    def _container(self, request):
+        name = request.match_info["name"]
+        container = self.containers.get(name)
+        if container is None:
+            raise web.HTTPNotFound(
+                text=json.dumps({"message": f"No such container: {name}"}),
+                content_type="application/json",
+            )
+        return container
+
+    async def _inspect(self, request):
+        return web.json_response(self._container(request).inspect())
+
+    async def _restart(self, request):
+        container = self._container(request)
+        self.restarts.append((container.name, int(request.query.get("t", 10))))
+        if container.running:
+            await self.set_running(container.name, False)
+        await self.set_running(container.name, True)
+        return web.Response(status=204)
+
+    async def _stop(self, request):
+        container = self._container(request)
+        self.stops.append((container.name, int(request.query.get("t", 10))))
+        if not container.running:
+            return web.Response(status=304)
+        await self.set_running(container.name, False)
+        return web.Response(status=204)
+
+    async def _events(self, request):
+        since = parse_since(request.query.get("since"))
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        queue = asyncio.Queue()
+        if since is not None:
+            for event in self.events:
+                if event["timeNano"] >= since:
+                    queue.put_nowait(event)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                await response.write(json.dumps(event).encode() + b"\n")
+        finally:
+            self._subscribers.discard(queue)
+
+    def _frame(self, container, entry, timestamps):
+        nanos, stream, data = entry
+        if timestamps:
+            data = rfc3339(nanos).encode() + b" " + data
+        if container.tty:
+            return data
+        return struct.pack(">BxxxL", stream, len(data)) + data
+
+    async def _logs(self, request):
+        container = self._container(request)
+        query = request.query
+        streams = {
+            stream
+            for stream, key in ((1, "stdout"), (2, "stderr"))
+            if query.get(key, "0") not in ("0", "false")
+        }
+        timestamps = query.get("timestamps", "0") not in ("0", "false")
+        since = parse_since(query.get("since"))
+        tail = query.get("tail", "all")
+
+        entries = [
+            entry
+            for entry in container.logs
+            if entry[1] in streams and (since is None or entry[0] >= since)
+        ]
+        if tail != "all":
+            entries = entries[len(entries) - int(tail) :] if int(tail) else []
+
+        content_type = "application/vnd.docker.raw-stream"
+        if not container.tty:
+            content_type = "application/vnd.docker.multiplexed-stream"
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        await response.prepare(request)
+        for entry in entries:
+            await response.write(self._frame(container, entry, timestamps))
+
+        if query.get("follow", "0") in ("0", "false"):
+            await response.write_eof()
+            return response
+
+        # Like the daemon, the stream ends when the container stops
+        sent, starts = len(container.logs), container.starts
+        while container.running and container.starts == starts:
+            async with container.changed:
+                await container.changed.wait()
+            for entry in container.logs[sent:]:
+                if entry[1] in streams:
+                    await response.write(self._frame(container, entry, timestamps))
+            sent = len(container.logs)
+        await response.write_eof()
+        return response
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2375)
+    parser.add_argument("--container", action="append", default=[])
+    parser.add_argument("--tty", action="store_true", help="containers have a TTY")
+    parser.add_argument(
+        "--log-interval", type=float, default=0.0, help="seconds between log lines"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = await FakeDockerServer(host=args.host, port=args.port).start()
+    for name in args.container or ["mc"]:
+        server.add_container(name, tty=args.tty)
+    logging.info(f"Fake Docker daemon listening on {server.base_url}")
+    try:
+        count = 0
+        while True:
+            if not args.log_interval:
+                await asyncio.Event().wait()
+            await asyncio.sleep(args.log_interval)
+            count += 1
+            for name in list(server.containers):
+                await server.write_log(
+                    name, f"[12:00:00] [Server thread/INFO]: Player{count} joined the game"
+                )
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,281 @@
+"""
+Asyncio stand-in for a Minecraft RCON server, for benchmarks and manual tests.
+
+Speaks the Source RCON protocol like the vanilla server: responses longer
+than 4096 bytes are split into several packets, and packets of an unknown
+type are answered with "Unknown request <type>", which is what RCONClient's
+end-of-response sentinel relies on. Like vanilla, each socket read must hold
+exactly one packet: a client that pipelines or coalesces packets gets its
+connection closed (--lenient reads packets from the stream instead). Faults
+can be injected: command latency and jitter, TCP writes split into tiny
+chunks, refused authentication and connections dropped mid-command.
+
+Built-in commands: `list`, `echo <text>` and `payload <bytes>`, which
+answers with that many bytes. Anything else gets the vanilla "Unknown or
+incomplete command" error.
+
+Usage: python benchmarks/fake_rcon_server.py [--port 25575] [--latency 0.01]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import struct
+
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_AUTH = 3
+
+# Size of the vanilla server's read buffer
+READ_SIZE = 1460
+
+
+class FakeRCONServer:
+    def __init__(
+        self,
+        password="secret",
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        jitter=0.0,
+        fragment_size=4096,
+        write_chunk=None,
+        fail_auth=False,
+        drop_rate=0.0,
+        serialize=True,
+        strict=True,
+        players=("Steve", "Alex"),
+        seed=None,
+    ):
+        self.password = password
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.fragment_size = fragment_size
+        self.write_chunk = write_chunk
+        self.fail_auth = fail_auth
+        self.drop_rate = drop_rate
+        self.strict = strict
+        self.players = list(players)
+        self.rng = random.Random(seed)
+        # Minecraft runs every command on the server thread, one at a time
+        self._server_thread = asyncio.Lock() if serialize else None
+        self._server = None
+        self._clients = set()
+
+        self.connections = 0
+        self.commands = 0
+        self.auth_failures = 0
+        self.dropped = 0
+        self.bad_reads = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def stats(self):
+        return {
+            "connections": self.connections,
+            "commands": self.commands,
+            "auth_failures": self.auth_failures,
+            "dropped": self.dropped,
+            "bad_reads": self.bad_reads,
+        }
+
+    def respond(self, command):
+        name, _, argument = command.partition(" ")
+        if name == "list":
+            return (
+                f"There are {len(self.players)} of a max of 20 players online: "
+                + ", ".join(self.players)
+            )
+        if name == "echo":
+            return argument
+        if name == "payload":
+            size = int(argument or 0)
+            line = "0123456789abcdef" * 4 + "\n"
+            return (line * (size // len(line) + 1))[:size]
+        return f"Unknown or incomplete command, see below for error{command}<--[HERE]"
+
+    @staticmethod
+    def _packet(request_id, packet_type, body):
+        data = body.encode("utf-8")
+        return (
+            struct.pack("<iii", len(data) + 10, request_id, packet_type)
+            + data
+            + b"\x00\x00"
+        )
+
+    async def _write(self, writer, data):
+        if not self.write_chunk:
+            writer.write(data)
+            await writer.drain()
+            return
+        for start in range(0, len(data), self.write_chunk):
+            writer.write(data[start : start + self.write_chunk])
+            await writer.drain()
+            await asyncio.sleep(0)
+
+    async def _read_packet(self, reader):
+        if self.strict:
+            # RconClient: one read is one packet, `if (k != i - 4) return;`
+            data = await reader.read(READ_SIZE)
+            if not data:
+                raise asyncio.IncompleteReadError(data, 4)
+            (size,) = struct.unpack("<i", data[:4]) if len(data) >= 4 else (None,)
+            if len(data) < 14 or size != len(data) - 4:
+                self.bad_reads += 1
+                logging.warning(f"Read of {len(data)} bytes is not one packet, closing")
+                raise ConnectionError("not one packet per read")
+            payload = data[4:]
+        else:
+            (size,) = struct.unpack("<i", await reader.readexactly(4))
+            payload = await reader.readexactly(size)
+        request_id, packet_type = struct.unpack("<ii", payload[:8])
+        return request_id, packet_type, payload[8:-2].decode("utf-8", errors="replace")
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._clients.add(writer)
+        authenticated = False
+        try:
+            while True:
+                request_id, packet_type, body = await self._read_packet(reader)
+
+                if packet_type == SERVERDATA_AUTH:
+                    authenticated = not self.fail_auth and body == self.password
+                    if not authenticated:
+                        self.auth_failures += 1
+                    await self._write(
+                        writer,
+                        self._packet(
+                            request_id if authenticated else -1,
+                            SERVERDATA_AUTH_RESPONSE,
+                            "",
+                        ),
+                    )
+                    continue
+
+                if not authenticated:
+                    break
+
+                if packet_type != SERVERDATA_EXECCOMMAND:
+                    await self._write(
+                        writer,
+                        self._packet(
+                            request_id,
+                            SERVERDATA_RESPONSE_VALUE,
+                            f"Unknown request {packet_type:x}",
+                        ),
+                    )
+                    continue
+
+                self.commands += 1
+                if self.drop_rate and self.rng.random() < self.drop_rate:
+                    self.dropped += 1
+                    break
+
+                response = await self._execute(body)
+                fragments = [
+                    response[start : start + self.fragment_size]
+                    for start in range(0, len(response), self.fragment_size)
+                ] or [""]
+                await self._write(
+                    writer,
+                    b"".join(
+                        self._packet(request_id, SERVERDATA_RESPONSE_VALUE, fragment)
+                        for fragment in fragments
+                    ),
+                )
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _execute(self, command):
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if self._server_thread is None:
+            await asyncio.sleep(delay)
+            return self.respond(command)
+        async with self._server_thread:
+            await asyncio.sleep(delay)
+            return self.respond(command)
+
+
+def add_server_arguments(parser):
+    """Fault injection options, shared with the load benchmark"""
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per command")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency")
+    parser.add_argument("--fragment-size", type=int, default=4096)
+    parser.add_argument("--write-chunk", type=int, help="split TCP writes in chunks of N bytes")
+    parser.add_argument("--fail-auth", action="store_true")
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--lenient",
+        action="store_true",
+        help="accept several packets per read, unlike Minecraft",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="run commands concurrently instead of one at a time like Minecraft",
+    )
+
+
+def server_from_arguments(args, **kwargs):
+    return FakeRCONServer(
+        password=args.password,
+        latency=args.latency,
+        jitter=args.jitter,
+        fragment_size=args.fragment_size,
+        write_chunk=args.write_chunk,
+        fail_auth=args.fail_auth,
+        drop_rate=args.drop_rate,
+        serialize=not args.parallel,
+        strict=not args.lenient,
+        **kwargs,
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=25575)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = await server_from_arguments(args, host=args.host, port=args.port).start()
+    logging.info(f"Fake RCON server listening on {args.host}:{server.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
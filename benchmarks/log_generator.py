@@ -0,0 +1,208 @@
+"""
+Synthetic `latest.log` traffic for the benchmarks.
+
+Lines are rendered with the headers of the vanilla, Paper, Forge and Fabric
+servers and tagged with the event LogMonitor is expected to classify them
+as (None for noise), so that a benchmark can check what was delivered.
+"""
+
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from monitoring import death_messages  # noqa: E402
+
+FLAVORS = ("vanilla", "paper", "forge", "fabric")
+
+BOOT_MESSAGES = [
+    "Starting minecraft server version 1.21.1",
+    "Loading properties",
+    "Default game type: SURVIVAL",
+    "Generating keypair",
+    "Starting Minecraft server on *:25565",
+    "Using epoll channel type",
+    "Preparing level \"world\"",
+    "Preparing start region for dimension minecraft:overworld",
+    "Preparing spawn area: {percent}%",
+    "Loaded {count} recipes",
+    "Loaded {count} advancements",
+    "Time elapsed: {millis} ms",
+]
+
+FORGE_BOOT_MESSAGES = [
+    "Found mod file {mod}-1.21.1-{count}.jar of type MOD with provider net.minecraftforge.fml.loading.moddiscovery.ModsFolderLocator",
+    "Loading {mod} configuration from config/{mod}-common.toml",
+]
+
+NOISE_MESSAGES = [
+    "Saving the game (this may take a moment!)",
+    "Saved the game",
+    "Can't keep up! Is the server overloaded? Running {millis}ms or {ticks} ticks behind",
+    "{player} has made the advancement [Stone Age]",
+    "{player} lost connection: Disconnected",
+]
+
+CHAT_MESSAGES = [
+    "anyone got spare iron?",
+    "brb",
+    "gg",
+    "where is the nether portal",
+    "omw",
+    "who took my diamonds",
+]
+
+MODS = ["create", "jei", "ae2", "mekanism", "botania", "ftbquests"]
+
+
+class LogGenerator:
+    def __init__(self, flavor="vanilla", seed=1234, players=20):
+        if flavor not in FLAVORS:
+            raise ValueError(f"Unknown log flavor {flavor}")
+        self.flavor = flavor
+        self.rng = random.Random(seed)
+        self.players = [
+            f"{self.rng.choice(death_messages.COMMON_PLAYER_NAMES)}{index}"
+            for index in range(players)
+        ]
+        self.clock = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+    def header(self, thread="Server thread", level="INFO", logger="minecraft/MinecraftServer"):
+        self.clock += datetime.timedelta(milliseconds=self.rng.randint(0, 50))
+        if self.flavor == "paper":
+            return f"[{self.clock:%H:%M:%S} {level}]: "
+        if self.flavor == "forge":
+            stamp = f"{self.clock:%d%b%Y %H:%M:%S}.{self.clock.microsecond // 1000:03d}"
+            return f"[{stamp}] [{thread}/{level}] [{logger}/]: "
+        if self.flavor == "fabric":
+            return f"[{self.clock:%H:%M:%S}] [{thread}/{level}] (Minecraft) "
+        return f"[{self.clock:%H:%M:%S}] [{thread}/{level}]: "
+
+    def line(self, message, event=None, **header):
+        return self.header(**header) + message, event
+
+    def player(self):
+        return self.rng.choice(self.players)
+
+    def boot(self, count):
+        """Startup flood ending with the "Done" line"""
+        messages = BOOT_MESSAGES + (FORGE_BOOT_MESSAGES if self.flavor == "forge" else [])
+        lines = []
+        for index in range(count):
+            message = self.rng.choice(messages).format(
+                percent=index * 100 // count,
+                count=self.rng.randint(100, 2000),
+                millis=self.rng.randint(1, 9000),
+                mod=self.rng.choice(MODS),
+            )
+            thread = "main" if index < count // 4 else "Server thread"
+            lines.append(self.line(message, thread=thread))
+        lines.append(
+            self.line(
+                f'Done ({self.rng.uniform(5, 90):.3f}s)! For help, type "help"', "ready"
+            )
+        )
+        return lines
+
+    def join(self, player=None):
+        return self.line(f"{player or self.player()} joined the game", "join")
+
+    def leave(self, player=None):
+        return self.line(f"{player or self.player()} left the game", "leave")
+
+    def chat(self, player=None, message=None):
+        message = message or self.rng.choice(CHAT_MESSAGES)
+        return self.line(f"<{player or self.player()}> {message}", "chat", thread="Async Chat Thread - #0")
+
+    def death(self, player=None):
+        template = self.rng.choice(death_messages.ALL_DEATH_MESSAGES)
+        message = (
+            template.replace("<player>", player or self.player())
+            .replace("<player/mob>", self.rng.choice(death_messages.COMMON_MOB_NAMES))
+            .replace("<item>", self.rng.choice(death_messages.COMMON_ITEMS))
+        )
+        return self.line(message, "death")
+
+    def crash(self):
+        """Fatal exception followed by its stack trace, one log entry"""
+        lines = [
+            self.line(
+                "Encountered an unexpected exception",
+                "crash",
+                level="ERROR",
+                logger="minecraft/MinecraftServer",
+            )
+        ]
+        lines.append(("java.lang.IllegalStateException: Ticking entity: Zombie", None))
+        for frame in range(self.rng.randint(5, 40)):
+            lines.append(
+                (f"\tat net.minecraft.server.MinecraftServer.tick{frame}(MinecraftServer.java:{frame})", None)
+            )
+        lines.append(("Caused by: java.lang.NullPointerException", None))
+        return lines
+
+    def noise(self):
+        message = self.rng.choice(NOISE_MESSAGES).format(
+            player=self.player(),
+            millis=self.rng.randint(2000, 20000),
+            ticks=self.rng.randint(40, 400),
+        )
+        level = "WARN" if message.startswith("Can't keep up") else "INFO"
+        # Lag warnings are only logged and counted, advancements are classified
+        event = "advancement" if "has made the advancement" in message else None
+        return self.line(message, event, level=level)
+
+    def mixed(self, count, chat=0.3, death=0.05, presence=0.05):
+        """Ordinary gameplay: mostly noise, some chat, joins/leaves and deaths"""
+        lines = []
+        for _ in range(count):
+            roll = self.rng.random()
+            if roll < chat:
+                lines.append(self.chat())
+            elif roll < chat + death:
+                lines.append(self.death())
+            elif roll < chat + death + presence:
+                lines.append(self.rng.choice((self.join, self.leave))())
+            else:
+                lines.append(self.noise())
+        return lines
+
+
+def scenarios(generator, scale=1.0):
+    """
+    Named scenarios as lists of steps: ("write", lines), ("sleep", seconds)
+    and ("rotate",). `waiting_for_startup` tells whether the server boots.
+    """
+
+    def n(count):
+        return max(1, int(count * scale))
+
+    boot = []
+    boot_lines = generator.boot(n(2000))
+    for start in range(0, len(boot_lines), 50):
+        boot.append(("write", boot_lines[start : start + 50]))
+        boot.append(("sleep", 0.05))
+
+    chat_burst = []
+    for _ in range(n(10)):
+        chat_burst.append(("write", [generator.chat() for _ in range(50)]))
+        chat_burst.append(("sleep", 0.1))
+
+    mass_death = [("write", [generator.death() for _ in range(n(300))])]
+
+    rotation = [
+        ("write", generator.mixed(n(1000))),
+        ("write", generator.crash()),
+        ("sleep", 0.2),
+        ("rotate",),
+        ("write", generator.mixed(n(1000))),
+    ]
+
+    return {
+        "boot": {"waiting_for_startup": True, "steps": boot},
+        "chat_burst": {"waiting_for_startup": False, "steps": chat_burst},
+        "mass_death": {"waiting_for_startup": False, "steps": mass_death},
+        "rotation": {"waiting_for_startup": False, "steps": rotation},
+    }
@@ -2,10 +2,19 @@ import logging
 import discord
 from discord.ext import commands
 import asyncio
+import time
 from typing import Optional
 
+from config_parser import CONFIG_PATH
+from config_watcher import ConfigWatcher
 from container import Container
+from docker_client import DockerClient
+from monitoring.docker_events import DockerEventHub
+from monitoring.log_reader import LogReader
+from log_workers import LogWorkerPool
 from health_check import HealthCheck
+from metrics import REGISTRY, Counter, Gauge, remove_container_series
+from rate_scheduler import RateScheduler
 
 
 class AppBot(commands.Bot):
@@ -19,48 +28,259 @@ class AppBot(commands.Bot):
 
 
 class App:
-    def __init__(self, envvars, container_configs):
+    # Settings a running container can take without restarting its monitors
+    RCON_SETTINGS = ("rcon_port", "rcon_password", "rcon_cache_ttls")
+
+    def __init__(self, envvars, container_configs, config_path=CONFIG_PATH):
         self.envvars = envvars
         self.container_configs = container_configs
-        self.containers = []
+        # Indexed by name, in configuration order
+        self.containers = {}
+        self._initialized = False
+        self._channel_fetches = {}
+        self._readiness_task = None
+        self._reload_lock = asyncio.Lock()
+        self.config_watcher = None
+        if envvars.config_reload_interval > 0:
+            self.config_watcher = ConfigWatcher(
+                config_path,
+                self.apply_container_configs,
+                interval=envvars.config_reload_interval,
+            )
+        self.rate_scheduler = RateScheduler()
+        self.docker_client = DockerClient()
+        self.docker_events = DockerEventHub(self.docker_client)
+        # Clients and event streams of the other Docker hosts, by base URL
+        self.docker_clients = {}
+        self.docker_event_hubs = {}
+        # Change detection shared by the log monitors of every container
+        self.log_reader = LogReader()
+        self.log_workers = None
+        if envvars.log_workers > 0:
+            self.log_workers = LogWorkerPool(envvars.log_workers)
+        REGISTRY.add_collector(self.collect_metrics)
 
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
-        self.bot = AppBot(command_prefix="!", intents=intents)
+        self.bot = AppBot(
+            command_prefix="!",
+            intents=intents,
+            http_trace=self.rate_scheduler.trace_config(),
+        )
 
         self.bot.remove_command("help")
 
+    async def get_channel(self, channel_id):
+        """
+        Channel by id, from the gateway cache or fetched once: containers
+        sharing a channel wait for the same request.
+        """
+        channel = self.bot.get_channel(channel_id)
+        if channel is not None:
+            return channel
+
+        fetch = self._channel_fetches.get(channel_id)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self.bot.fetch_channel(channel_id))
+            self._channel_fetches[channel_id] = fetch
+            fetch.add_done_callback(
+                lambda future: self._forget_failed_fetch(channel_id, future)
+            )
+        return await asyncio.shield(fetch)
+
+    def _forget_failed_fetch(self, channel_id, future):
+        if future.cancelled() or future.exception() is not None:
+            self._channel_fetches.pop(channel_id, None)
+
+    def get_docker_client(self, base_url=None):
+        """Client of the given Docker daemon, the default one when None"""
+        if base_url is None:
+            return self.docker_client
+        if base_url not in self.docker_clients:
+            self.docker_clients[base_url] = DockerClient(base_url)
+        return self.docker_clients[base_url]
+
+    def get_docker_events(self, base_url=None):
+        """Event stream of the given Docker daemon, the default one when None"""
+        if base_url is None:
+            return self.docker_events
+        if base_url not in self.docker_event_hubs:
+            self.docker_event_hubs[base_url] = DockerEventHub(self.get_docker_client(base_url))
+        return self.docker_event_hubs[base_url]
+
+    async def add_container(self, container_config):
+        """Create a container and start its monitors, without waiting for them"""
+        logging.debug(f"Container : {container_config}")
+        channel = await self.get_channel(int(container_config.get("channel_id")))
+        docker_host = container_config.get("docker_host")
+        container = Container.create(
+            envvars=self.envvars,
+            name=container_config.get("name"),
+            host=container_config.get("host"),
+            rcon_port=container_config.get("rcon_port"),
+            rcon_password=container_config.get("rcon_password"),
+            channel=channel,
+            log_path=container_config.get("log_path"),
+            rate_scheduler=self.rate_scheduler,
+            rcon_cache_ttls=container_config.get("rcon_cache_ttls"),
+            docker_events=self.get_docker_events(docker_host),
+            log_rules=container_config.get("log_rules"),
+            log_format=container_config.get("log_format"),
+            log_reader=self.log_reader,
+            log_workers=self.log_workers,
+            log_source=container_config.get("log_source", "file"),
+            docker_client=self.get_docker_client(docker_host),
+        )
+        # Usable by commands right away, its monitors attach in the background
+        self.containers[container.name] = container
+        return container
+
+    async def remove_container(self, name):
+        container = self.containers.pop(name, None)
+        if container:
+            await container.stop()
+            remove_container_series(container.name, container.host)
+
+    @staticmethod
+    def unique_configs(container_configs):
+        """Container configs by name, warning about duplicates"""
+        configs = {config.get("name"): config for config in container_configs}
+        if len(configs) != len(container_configs):
+            logging.warning("Duplicate container names in configuration, the last one wins")
+        return configs
+
+    async def add_containers(self, container_configs):
+        """Create containers concurrently, logging those that fail"""
+        results = await asyncio.gather(
+            *(self.add_container(config) for config in container_configs),
+            return_exceptions=True,
+        )
+        for config, result in zip(container_configs, results):
+            if isinstance(result, Exception):
+                logging.error(
+                    f"Could not initialize container {config.get('name')}: {result}"
+                )
+
+        # Keep the configuration order for autocomplete
+        self.containers = {
+            config.get("name"): self.containers[config.get("name")]
+            for config in self.container_configs
+            if config.get("name") in self.containers
+        }
+
     async def initialize_containers(self):
-        """Initialize containers after bot is ready"""
+        """
+        Initialize containers after bot is ready. Containers are created
+        concurrently and each becomes ready on its own; this returns once
+        they are all created.
+        """
+        if self._initialized:
+            # on_ready fires again after the gateway reconnects
+            return self.containers
+        self._initialized = True
+
         logging.debug(f"Container configs: {self.container_configs}")
+        self.container_configs = list(self.unique_configs(self.container_configs).values())
+        await self.add_containers(self.container_configs)
+        self._readiness_task = asyncio.create_task(
+            self.log_readiness(list(self.containers.values()))
+        )
+        if self.config_watcher:
+            self.config_watcher.start()
+        return self.containers
+
+    async def apply_container_configs(self, container_configs):
+        """
+        Apply a new container list: start added containers, stop removed
+        ones and reconfigure changed ones. RCON settings are swapped in
+        place, any other change restarts that container's monitors, which
+        resume from their checkpoint. Untouched containers keep running.
+        """
+        async with self._reload_lock:
+            old = {config.get("name"): config for config in self.container_configs}
+            new = self.unique_configs(container_configs)
 
-        for container_config in self.container_configs:
-            logging.debug(f"Container : {container_config}")
-            channel = await self.bot.fetch_channel(
-                int(container_config.get("channel_id"))
+            removed = [name for name in old if name not in new]
+            for name in removed:
+                await self.remove_container(name)
+
+            changed, restarted = [], []
+            for name, config in new.items():
+                if name not in old or config == old[name] or name not in self.containers:
+                    continue
+                changed.append(name)
+                keys = {
+                    key
+                    for key in config.keys() | old[name].keys()
+                    if config.get(key) != old[name].get(key)
+                }
+                if keys <= set(self.RCON_SETTINGS):
+                    self.containers[name].reconfigure_rcon(
+                        config.get("rcon_port"),
+                        config.get("rcon_password"),
+                        config.get("rcon_cache_ttls"),
+                    )
+                else:
+                    await self.remove_container(name)
+                    restarted.append(name)
+
+            # Also retries containers that failed to start with the old config
+            started = [name for name in new if name not in self.containers]
+            self.container_configs = list(new.values())
+            await self.add_containers([new[name] for name in started])
+            self._readiness_task = asyncio.create_task(
+                self.log_readiness(
+                    [self.containers[name] for name in started if name in self.containers]
+                )
             )
-            container = Container.create(
-                envvars=self.envvars,
-                name=container_config.get("name"),
-                host=container_config.get("host"),
-                rcon_port=container_config.get("rcon_port"),
-                rcon_password=container_config.get("rcon_password"),
-                channel=channel,
-                log_path=container_config.get("log_path"),
+
+            logging.info(
+                f"Configuration applied: {len(started) - len(restarted)} started, "
+                f"{len(removed)} removed, {len(changed)} changed ({len(restarted)} restarted)"
             )
-            self.containers.append(container)
 
-        await asyncio.gather(
-            *[container.wait_until_ready() for container in self.containers]
-        )
-        logging.info("All containers ready")
+    async def log_readiness(self, containers):
+        """Log each container as its monitors attach"""
+        started_at = time.monotonic()
 
-        return self.containers
+        async def wait(container):
+            await container.wait_until_ready()
+            logging.info(
+                f"Container {container.name} ready after {time.monotonic() - started_at:.1f}s"
+            )
+
+        await asyncio.gather(*(wait(container) for container in containers))
+        if containers:
+            logging.info("All containers ready")
+
+    def collect_metrics(self):
+        """Per-container values read at scrape time"""
+        tail_lag = Gauge(
+            "watchdog_log_tail_lag_bytes",
+            "Bytes written to the log file that were not read yet",
+            ["container"],
+        )
+        queue_depth = Gauge(
+            "watchdog_event_queue_depth", "Events waiting to be sent", ["container"]
+        )
+        queue_dropped = Counter(
+            "watchdog_event_queue_dropped_total",
+            "Droppable events discarded or merged by the queue",
+            ["container", "reason"],
+        )
+        for container in self.containers.values():
+            log_monitor = container.log_monitor
+            stats = log_monitor.event_queue.stats()
+            tail_lag.set(log_monitor.tail_lag(), container=container.name)
+            queue_depth.set(stats["depth"], container=container.name)
+            queue_dropped.inc(stats["dropped"], container=container.name, reason="dropped")
+            queue_dropped.inc(stats["merged"], container=container.name, reason="merged")
+        return [tail_lag, queue_depth, queue_dropped]
 
     async def run_discord_bot(self):
         """Run the Discord bot"""
-        health_check = HealthCheck()
+        health_check = HealthCheck(self, debug_port=self.envvars.debug_port)
         await health_check.start_server()
 
         self.bot.app = self
@@ -73,4 +293,20 @@ class App:
         try:
             await self.bot.start(self.envvars.discord_token)
         finally:
+            if self.config_watcher:
+                self.config_watcher.stop()
+            # Flushes the checkpoints of what reached Discord
+            await asyncio.gather(
+                *(container.stop() for container in self.containers.values()),
+                return_exceptions=True,
+            )
+            self.docker_events.stop()
+            for docker_events in self.docker_event_hubs.values():
+                docker_events.stop()
+            self.log_reader.stop()
+            if self.log_workers:
+                await self.log_workers.stop()
+            await self.docker_client.close()
+            for docker_client in self.docker_clients.values():
+                await docker_client.close()
             await self.bot.close()
@@ -1,10 +1,10 @@
 import logging
 import discord
-import docker
-import docker.errors
 from discord.ext import commands
 from discord import app_commands
 
+from docker_client import DockerAPIError, DockerConnectionError, DockerNotFound
+
 
 def requires_container():
     """Check if containers are configured before running a command."""
@@ -58,10 +58,7 @@ class CommandsCog(commands.Cog):
 
     def get_container_by_name(self, server_name: str):
         """Helper to get a container by its name."""
-        for container in self.app.containers:
-            if container.name == server_name:
-                return container
-        return None
+        return self.app.containers.get(server_name)
 
     async def server_autocomplete(
         self, interaction: discord.Interaction, current: str
@@ -69,11 +66,12 @@ class CommandsCog(commands.Cog):
         """Autocomplete for server selection - shows available servers."""
         if not self.app.containers:
             return []
+        current = current.lower()
         return [
-            app_commands.Choice(name=container.name, value=container.name)
-            for container in self.app.containers
-            if current.lower() in container.name.lower()
-        ]
+            app_commands.Choice(name=name, value=name)
+            for name in self.app.containers
+            if current in name.lower()
+        ][:25]
 
     async def locate_target_type_autocomplete(
         self, interaction: discord.Interaction, current: str
@@ -95,18 +93,13 @@ class CommandsCog(commands.Cog):
         container = self.get_container_by_name(server_name)  # type: ignore
         if not container:
             return []
-        players_response = await container.rcon_client.send_command_wrapper(
-            command="list"
-        )
-        # Extract player names from the response (assuming format "There are X of a max Y players online: player1, player2, ...")
-        if ":" in players_response:
-            players_list = players_response.split(":")[1].strip().split(", ")
-            return [
-                app_commands.Choice(name=player, value=player)
-                for player in players_list
-                if current.lower() in player.lower()
-            ]
-        return []
+        # Answered from the log-driven roster, RCON is only hit before its first sync
+        if not container.roster.synced and not await container.sync_roster():
+            return []
+        return [
+            app_commands.Choice(name=player, value=player)
+            for player in container.roster.matching(current)[:25]
+        ]
 
     @app_commands.command(
         name="list", description="Liste les joueurs connectés au serveur."
@@ -121,7 +114,14 @@ class CommandsCog(commands.Cog):
                 f"Serveur '{server}' introuvable.", ephemeral=True
             )
             return
-        players = await container.rcon_client.send_command_wrapper(command="list")
+        players = await container.get_online_players()
+        if players is None:
+            # Roster never synced and RCON unreachable: show RCON's error
+            players = await container.rcon_client.send_command_wrapper(command="list")
+        elif players:
+            players = f"{len(players)} joueur(s) connecté(s) : {', '.join(players)}"
+        else:
+            players = "Aucun joueur connecté."
         await interaction.response.send_message(players, ephemeral=True)
 
     @app_commands.command(
@@ -223,24 +223,29 @@ class CommandsCog(commands.Cog):
             )
             return
 
-        client = docker.from_env()
+        # Defer response since the restart waits for the server to stop
+        await interaction.response.defer(ephemeral=True)
+
         try:
-            docker_container = client.containers.get(container.host)
-            docker_container.restart()
-        except docker.errors.NotFound:
-            await interaction.response.send_message(
+            await (container.docker_client or self.app.docker_client).restart(container.host)
+        except DockerNotFound:
+            await interaction.followup.send(
                 f"Conteneur Docker pour le serveur '{server}' introuvable.",
                 ephemeral=True,
             )
             return
-        except docker.errors.APIError as e:
-            await interaction.response.send_message(
+        except DockerConnectionError:
+            await interaction.followup.send(
+                f"Docker injoignable, le serveur '{server}' n'a pas été redémarré.",
+                ephemeral=True,
+            )
+            return
+        except DockerAPIError as e:
+            await interaction.followup.send(
                 f"Erreur lors du redémarrage du serveur '{server}': {e}", ephemeral=True
             )
             return
-        await interaction.response.send_message(
-            "Redémarrage du serveur...", ephemeral=True
-        )
+        await interaction.followup.send("Redémarrage du serveur...", ephemeral=True)
 
     @app_commands.command(
         name="chaussette", description="Envoie une photo aléatoire de Chaussette."
@@ -3,12 +3,22 @@ import os
 import yaml
 
 
+CONFIG_PATH = "/app/config/config.yaml"
+
+
 class ConfigParser:
-    def __init__(self):
-        with open("/app/config/config.yaml", "r") as file:
-            containers = yaml.safe_load(file)
-            self.containers = containers.get("containers", [])
-            logging.debug(f"Loaded containers from config: {self.containers}")
+    def __init__(self, path=CONFIG_PATH):
+        self.path = path
+        self.containers = self.read_containers(path)
+
+    @staticmethod
+    def read_containers(path=CONFIG_PATH):
+        """Container list of a config file, raising on unreadable YAML"""
+        with open(path, "r") as file:
+            config = yaml.safe_load(file) or {}
+        containers = config.get("containers") or []
+        logging.debug(f"Loaded containers from config: {containers}")
+        return containers
 
     @staticmethod
     def load_env():
@@ -17,7 +27,18 @@ class ConfigParser:
                 self.discord_token = os.getenv("DISCORD_TOKEN")
                 self.guild_id = os.getenv("GUILD_ID")
                 self.dev_mode = os.getenv("DEV", "false") == "true"
-                self.log_update_interval = os.getenv("LOG_UPDATE_INTERVAL", 1)
+                self.log_update_interval = os.getenv("LOG_UPDATE_INTERVAL", 2)
+                self.log_catchup_max_lines = int(
+                    os.getenv("LOG_CATCHUP_MAX_LINES", 50)
+                )
+                self.roster_reconcile_interval = float(
+                    os.getenv("ROSTER_RECONCILE_INTERVAL", 300)
+                )
+                self.config_reload_interval = float(
+                    os.getenv("CONFIG_RELOAD_INTERVAL", 5)
+                )
+                self.log_workers = int(os.getenv("LOG_WORKERS", 0))
+                self.debug_port = int(os.getenv("DEBUG_PORT", 0))
                 self.chaussette = os.getenv("CHAUSSETTE", "")
 
                 if self.discord_token == "" or self.discord_token is None:
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+
+import yaml
+
+from config_parser import ConfigParser
+from monitoring.inotify import Inotify
+
+
+class ConfigWatcher:
+    """
+    Watch config.yaml and hand the new container list to `on_change` when
+    the file changes. Wakes up from inotify on the config directory when
+    available (which also catches the symlink swaps of mounted configs),
+    and checks the file every `interval` seconds regardless.
+
+    An unreadable file is logged and ignored: the running configuration
+    stays in place until the file is fixed.
+    """
+
+    settle_delay = 0.5
+
+    def __init__(self, path, on_change, interval=5.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self.signature()
+        self._task = None
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.watch())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def watch(self):
+        inotify = Inotify.create()
+        if inotify:
+            inotify.add_watch(os.path.dirname(os.path.abspath(self.path)))
+            inotify.attach()
+        logging.info(f"Watching {self.path} for configuration changes")
+        try:
+            while True:
+                if inotify:
+                    await inotify.wait(self.interval)
+                    inotify.pop_events()
+                else:
+                    await asyncio.sleep(self.interval)
+
+                if self.signature() == self._signature:
+                    continue
+                # Let the editor or the config sync finish writing
+                await asyncio.sleep(self.settle_delay)
+                self._signature = self.signature()
+                await self.reload()
+        finally:
+            if inotify:
+                inotify.close()
+
+    async def reload(self):
+        try:
+            containers = ConfigParser.read_containers(self.path)
+        except (OSError, yaml.YAMLError) as e:
+            logging.error(f"Ignoring unreadable configuration {self.path}: {e}")
+            return
+        logging.info(f"Configuration {self.path} changed, applying it")
+        try:
+            await self.on_change(containers)
+        except Exception as e:
+            logging.error(f"Failed to apply configuration {self.path}: {e}")
@@ -2,7 +2,10 @@ import logging
 import asyncio
 
 from monitoring.docker_monitor import DockerMonitor
+from monitoring.event_queue import EventQueue
 from monitoring.log_monitor import LogMonitor
+from monitoring.player_roster import PlayerRoster
+from rcon_cache import RCONResponseCache
 from rcon_client import RCONClient
 from messager import Messager
 
@@ -17,6 +20,15 @@ class Container:
         rcon_password=None,
         log_path=None,
         channel=None,
+        rate_scheduler=None,
+        rcon_cache_ttls=None,
+        docker_events=None,
+        log_rules=None,
+        log_format=None,
+        log_reader=None,
+        log_workers=None,
+        log_source="file",
+        docker_client=None,
     ):
         self.envvars = envvars
         self.name = name
@@ -25,14 +37,28 @@ class Container:
         self.rcon_password = rcon_password
         self.log_path = log_path
         self.channel = channel
+        # Daemon running the container, for its logs and /restart
+        self.docker_client = docker_client
         self.log_monitors_ready = asyncio.Event()
         self.docker_monitors_ready = asyncio.Event()
+        self.log_monitor_task = None
+        self.docker_monitor_task = None
+        self.roster_task = None
 
         logging.debug(
             f"Initializing Container: {self.name} at {self.host}, log: {self.log_path}"
         )
 
-        self.messager = Messager(self.channel)
+        self.messager = Messager(
+            self.channel,
+            rate_scheduler,
+            self.name,
+            edit_interval=float(self.envvars.log_update_interval),
+        )
+
+        self.roster = PlayerRoster(self.name)
+        # Discord sends of both monitors, in the order they happened
+        self.event_queue = EventQueue(self.name)
 
         self.docker_monitor = DockerMonitor(
             self.host,
@@ -40,6 +66,11 @@ class Container:
             self.name,
             self.docker_monitors_ready,
             self.messager,
+            docker_events,
+            roster=self.roster,
+            event_queue=self.event_queue,
+            # RCON is coming back, don't wait out the failed attempts' backoff
+            on_server_start=lambda: self.rcon_client.reset_backoff(),
         )
         self.log_monitor = LogMonitor(
             self.envvars.log_update_interval,
@@ -50,8 +81,36 @@ class Container:
             self.host,
             self.log_monitors_ready,
             self.messager,
+            catchup_max_lines=self.envvars.log_catchup_max_lines,
+            roster=self.roster,
+            log_rules=log_rules,
+            log_format=log_format,
+            log_reader=log_reader,
+            log_workers=log_workers,
+            log_source=log_source,
+            docker_client=docker_client,
+            event_queue=self.event_queue,
         )
-        self.rcon_client = RCONClient(self.host, self.rcon_port, self.rcon_password)
+        self.rcon_client = self.create_rcon_client(rcon_cache_ttls)
+
+    def create_rcon_client(self, rcon_cache_ttls=None):
+        return RCONClient(
+            self.host,
+            self.rcon_port,
+            self.rcon_password,
+            cache=RCONResponseCache(rcon_cache_ttls),
+        )
+
+    def reconfigure_rcon(self, rcon_port, rcon_password, rcon_cache_ttls=None):
+        """Switch to new RCON settings, closing the old connections"""
+        logging.info(f"Reconfiguring RCON of {self.name}")
+        self.rcon_port = rcon_port
+        self.rcon_password = rcon_password
+        old_client, self.rcon_client = (
+            self.rcon_client,
+            self.create_rcon_client(rcon_cache_ttls),
+        )
+        old_client.close()
 
     def start_monitors(self):
         global log_monitor_task, docker_monitor_task
@@ -60,6 +119,50 @@ class Container:
         self.docker_monitor_task = asyncio.create_task(
             self.docker_monitor.start_monitoring()
         )
+        self.roster_task = asyncio.create_task(self.reconcile_roster())
+
+    async def stop(self):
+        """Stop the monitors and close the RCON connections"""
+        logging.info(f"Stopping container {self.name}")
+        self.log_monitor.stop_monitoring()
+        self.docker_monitor.stop_monitoring()
+        self.messager.release_updates()
+
+        tasks = [
+            task
+            for task in (self.log_monitor_task, self.docker_monitor_task, self.roster_task)
+            if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.rcon_client.close()
+
+    async def sync_roster(self):
+        """Reconcile the player roster with RCON `list`, False if unreachable"""
+        try:
+            response = await self.rcon_client.execute("list")
+        except Exception as e:
+            logging.debug(f"Roster sync skipped for {self.name}: {e}")
+            return False
+        return self.roster.reconcile(response)
+
+    async def reconcile_roster(self):
+        """Periodically correct the log-driven roster against the server"""
+        while True:
+            await self.sync_roster()
+            await asyncio.sleep(self.envvars.roster_reconcile_interval)
+
+    async def get_online_players(self):
+        """Online players from the roster, syncing first if it was never synced"""
+        if not self.roster.synced and not await self.sync_roster():
+            return None
+        return self.roster.players
+
+    @property
+    def ready(self):
+        """Whether both monitors have attached"""
+        return self.log_monitors_ready.is_set() and self.docker_monitors_ready.is_set()
 
     async def wait_until_ready(self):
         """Wait until monitors signal they're ready"""
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+
+class DockerAPIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class DockerNotFound(DockerAPIError):
+    pass
+
+
+class DockerConnectionError(DockerAPIError):
+    """The daemon could not be reached, or did not answer in time"""
+
+    def __init__(self, message):
+        super().__init__(None, message)
+
+    def __str__(self):
+        return self.message
+
+
+class DockerClient:
+    """
+    Minimal asynchronous client for the Docker Engine API, talking to the
+    daemon over its unix socket (or TCP) through one shared aiohttp session.
+
+    The daemon address comes from `base_url`, else DOCKER_HOST, else the
+    default unix socket, so it can be pointed at a fake server in tests.
+    """
+
+    api_version = "v1.41"
+
+    def __init__(self, base_url=None, timeout=30):
+        self.base_url = base_url or os.getenv(
+            "DOCKER_HOST", "unix:///var/run/docker.sock"
+        )
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+
+    def _create_session(self):
+        if self.base_url.startswith("unix://"):
+            connector = aiohttp.UnixConnector(path=self.base_url[len("unix://") :])
+            root = "http://docker"
+        else:
+            connector = aiohttp.TCPConnector()
+            root = self.base_url.replace("tcp://", "http://", 1)
+        return aiohttp.ClientSession(
+            base_url=f"{root.rstrip('/')}/", connector=connector, timeout=self.timeout
+        )
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    def _url(self, path):
+        return f"{self.api_version}/{path.lstrip('/')}"
+
+    @staticmethod
+    async def _raise_for_status(response):
+        if response.status < 400:
+            return
+        try:
+            message = (await response.json()).get("message", response.reason)
+        except (aiohttp.ContentTypeError, ValueError):
+            message = await response.text()
+        if response.status == 404:
+            raise DockerNotFound(response.status, message)
+        raise DockerAPIError(response.status, message)
+
+    async def _request(self, method, path, params=None, timeout=None):
+        try:
+            async with self.session.request(
+                method, self._url(path), params=params, timeout=timeout
+            ) as response:
+                await self._raise_for_status(response)
+                if response.content_type == "application/json":
+                    return await response.json()
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            raise DockerConnectionError(
+                f"Docker daemon unreachable: {str(e) or type(e).__name__}"
+            ) from e
+
+    @staticmethod
+    def _stream_params(params):
+        return {key: value for key, value in params.items() if value is not None}
+
+    @asynccontextmanager
+    async def events(self, filters=None, since=None):
+        """
+        Open the event stream. Yields an async iterator of decoded events; the
+        stream is established once the context is entered.
+        """
+        params = self._stream_params(
+            {
+                "filters": json.dumps(filters) if filters else None,
+                "since": since,
+            }
+        )
+        async with self.session.get(
+            self._url("events"),
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=None),
+        ) as response:
+            await self._raise_for_status(response)
+            yield self._decode_lines(response.content)
+
+    @staticmethod
+    async def _decode_lines(content):
+        async for line in content:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logging.warning(f"Ignoring undecodable Docker event: {line[:200]}")
+
+    async def inspect(self, name):
+        """Return the container's inspect document."""
+        return await self._request("GET", f"containers/{name}/json")
+
+    async def restart(self, name, timeout=10):
+        """Restart a container, waiting up to `timeout` seconds for it to stop."""
+        await self._request(
+            "POST",
+            f"containers/{name}/restart",
+            params={"t": timeout},
+            timeout=aiohttp.ClientTimeout(total=timeout + 60),
+        )
+
+    async def stop(self, name, timeout=10):
+        """Stop a container, killing it after `timeout` seconds."""
+        await self._request(
+            "POST",
+            f"containers/{name}/stop",
+            params={"t": timeout},
+            timeout=aiohttp.ClientTimeout(total=timeout + 60),
+        )
+
+    @asynccontextmanager
+    async def logs(
+        self,
+        name,
+        follow=False,
+        since=None,
+        tail=None,
+        stdout=True,
+        stderr=True,
+        timestamps=False,
+    ):
+        """
+        Open the container's log stream. Yields the raw body reader; unless the
+        container has a TTY, it is in Docker's multiplexed frame format.
+        """
+        params = self._stream_params(
+            {
+                "follow": int(follow),
+                "stdout": int(stdout),
+                "stderr": int(stderr),
+                "timestamps": int(timestamps),
+                "since": since,
+                "tail": tail,
+            }
+        )
+        async with self.session.get(
+            self._url(f"containers/{name}/logs"),
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=None),
+        ) as response:
+            await self._raise_for_status(response)
+            yield response.content
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
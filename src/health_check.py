@@ -1,23 +1,249 @@
+import asyncio
 import logging
+import time
 from aiohttp import web
 
+from loop_monitor import LoopLagMonitor
+from metrics import REGISTRY
+
+OK = "ok"
+DEGRADED = "degraded"
+CRITICAL = "critical"
+STARTING = "starting"
+
+_SEVERITY = {OK: 0, DEGRADED: 1, STARTING: 2, CRITICAL: 3}
+
+
+def _worst(*statuses):
+    return max(statuses, key=_SEVERITY.__getitem__, default=OK)
+
 
 class HealthCheck:
-    def __init__(self):
+    """
+    Readiness and liveness of the bot, broken down per component. Only stale
+    or dead components the bot cannot recover from on its own are critical
+    and turn the endpoints into a 503; an offline Minecraft server or a
+    lagging tail is reported as degraded.
+    """
+
+    log_heartbeat_timeout = 30.0
+    docker_disconnect_timeout = 180.0
+    loop_lag_degraded = 0.5
+    loop_lag_critical = 10.0
+    loop_stall_timeout = 30.0
+    tail_lag_degraded = 1024 * 1024
+
+    def __init__(self, app=None, loop_monitor=None, debug_port=0):
         self.ready = False
+        self.app = app
+        self.loop_monitor = loop_monitor or LoopLagMonitor()
+        # The debug endpoints expose stacks, never on the public bind
+        self.debug_port = debug_port
+
+    @property
+    def containers(self):
+        return list(self.app.containers.values()) if self.app else []
+
+    def check_event_loop(self):
+        monitor = self.loop_monitor
+        if monitor.last_tick is None:
+            return {"status": STARTING}
+
+        status = OK
+        since_tick = time.monotonic() - monitor.last_tick
+        if monitor.max_lag > self.loop_lag_critical or since_tick > self.loop_stall_timeout:
+            status = CRITICAL
+        elif monitor.max_lag > self.loop_lag_degraded:
+            status = DEGRADED
+        return {
+            "status": status,
+            "lag": round(monitor.lag, 4),
+            "max_lag": round(monitor.max_lag, 4),
+        }
+
+    def check_docker_events(self, hub=None):
+        if self.app is None:
+            return {"status": STARTING}
+
+        hub = hub or self.app.docker_events
+        if not hub.handlers:
+            # No container on that daemon, the stream is not opened
+            return {"status": OK, "connected": hub.connected.is_set(), "watched": 0}
+        now = time.monotonic()
+        if hub.connected.is_set():
+            return {
+                "status": OK,
+                "connected": True,
+                "stream_age": round(now - hub.connected_at, 1),
+                "events_received": hub.events_received,
+                "reconnects": hub.reconnects,
+            }
+
+        disconnected_for = now - hub.disconnected_at
+        return {
+            "status": CRITICAL
+            if disconnected_for > self.docker_disconnect_timeout
+            else DEGRADED,
+            "connected": False,
+            "disconnected_for": round(disconnected_for, 1),
+            "reconnects": hub.reconnects,
+        }
+
+    def check_log_monitor(self, container):
+        log_monitor = container.log_monitor
+        task = container.log_monitor_task
+        if task.done():
+            error = "cancelled" if task.cancelled() else repr(task.exception())
+            return {"status": CRITICAL, "running": False, "error": error}
+
+        heartbeat_age = log_monitor.heartbeat_age()
+        tail_lag = log_monitor.tail_lag()
+        queue_blocked = log_monitor.event_queue.blocked
+        status = OK
+        if heartbeat_age > self.log_heartbeat_timeout:
+            # Waiting for room in a full event queue is Discord backpressure
+            status = DEGRADED if queue_blocked else CRITICAL
+        elif tail_lag > self.tail_lag_degraded or not log_monitor.following:
+            status = DEGRADED
+        return {
+            "status": status,
+            "running": True,
+            "following": log_monitor.following,
+            "heartbeat_age": round(heartbeat_age, 1),
+            "tail_lag": tail_lag,
+            "queue_depth": log_monitor.event_queue.depth,
+            "queue_blocked": queue_blocked,
+        }
+
+    def check_rcon(self, container):
+        rcon_client = container.rcon_client
+        reachable = rcon_client.reachable
+        report = {
+            "status": DEGRADED if reachable is False else OK,
+            "reachable": reachable,
+            "open_connections": rcon_client.open_connections,
+        }
+        if reachable is False:
+            report["error"] = rcon_client.last_error_message
+        return report
+
+    def check_container(self, container):
+        checks = {
+            "log_monitor": self.check_log_monitor(container),
+            "rcon": self.check_rcon(container),
+            "docker": {"status": OK, "running": container.docker_monitor.running},
+            # A container still attaching must not hold the whole bot unhealthy
+            "readiness": {
+                "status": OK if container.ready else DEGRADED,
+                "ready": container.ready,
+            },
+        }
+        return {
+            "status": _worst(*(check["status"] for check in checks.values())),
+            **checks,
+        }
+
+    def report(self):
+        """Full breakdown of every component"""
+        checks = {
+            "event_loop": self.check_event_loop(),
+            "docker_events": self.check_docker_events(),
+            "containers": {},
+        }
+        for base_url, hub in self.app.docker_event_hubs.items() if self.app else ():
+            checks[f"docker_events {base_url}"] = self.check_docker_events(hub)
+        for container in self.containers:
+            try:
+                checks["containers"][container.name] = self.check_container(container)
+            except Exception as e:
+                logging.error(f"Health check of {container.name} failed: {e}")
+                checks["containers"][container.name] = {
+                    "status": CRITICAL,
+                    "error": repr(e),
+                }
+
+        status = _worst(
+            *(check["status"] for name, check in checks.items() if name != "containers"),
+            *(check["status"] for check in checks["containers"].values()),
+        )
+        if not self.ready:
+            status = _worst(status, STARTING)
+        return {"status": status, "ready": self.ready, "checks": checks}
+
+    @staticmethod
+    def _failing(checks, prefix=""):
+        """Paths of the leaf checks that are not ok"""
+        failing = []
+        for name, check in checks.items():
+            nested = {key: value for key, value in check.items() if isinstance(value, dict)}
+            if nested:
+                failing.extend(HealthCheck._failing(nested, f"{prefix}{name}."))
+            elif check.get("status", OK) != OK:
+                failing.append(f"{prefix}{name}: {check['status']}")
+        return failing
+
+    def _respond(self, body):
+        status = 503 if body["status"] in (CRITICAL, STARTING) else 200
+        return web.json_response(body, status=status)
 
     async def health_check_handler(self, request):
         """Health check endpoint"""
-        if self.ready:
-            return web.Response(text="OK", status=200)
-        return web.Response(text="NOT READY", status=503)
+        report = self.report()
+        return self._respond(
+            {
+                "status": report["status"],
+                "failing": self._failing(report["checks"]),
+            }
+        )
+
+    async def health_detail_handler(self, request):
+        """Per-component health breakdown"""
+        return self._respond(self.report())
+
+    async def metrics_handler(self, request):
+        """Prometheus metrics endpoint"""
+        return web.Response(
+            text=REGISTRY.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def slow_callbacks_handler(self, request):
+        """Recent callbacks that blocked the event loop, with their stack"""
+        return web.json_response(
+            [stall.to_dict() for stall in self.loop_monitor.slow_callbacks]
+        )
+
+    async def profile_handler(self, request):
+        """Sampling profile of the event loop thread, in collapsed stack format"""
+        try:
+            duration = min(float(request.query.get("seconds", 5)), 60.0)
+            interval = max(float(request.query.get("interval", 0.005)), 0.001)
+        except ValueError:
+            return web.Response(text="Invalid seconds or interval", status=400)
+
+        samples = await asyncio.to_thread(self.loop_monitor.profile, duration, interval)
+        return web.Response(
+            text="".join(f"{stack} {count}\n" for count, stack in samples)
+        )
 
     async def start_server(self):
         """Start health check HTTP server"""
+        self.loop_monitor.start()
         app = web.Application()
         app.router.add_get("/health", self.health_check_handler)
+        app.router.add_get("/health/detail", self.health_detail_handler)
+        app.router.add_get("/metrics", self.metrics_handler)
         runner = web.AppRunner(app)
         await runner.setup()
         site = web.TCPSite(runner, "0.0.0.0", 8080)
         await site.start()
         logging.info("Health check server started on port 8080")
+
+        if self.debug_port:
+            debug_app = web.Application()
+            debug_app.router.add_get("/debug/slow", self.slow_callbacks_handler)
+            debug_app.router.add_get("/debug/profile", self.profile_handler)
+            debug_runner = web.AppRunner(debug_app)
+            await debug_runner.setup()
+            await web.TCPSite(debug_runner, "127.0.0.1", self.debug_port).start()
+            logging.info(f"Debug endpoints served on 127.0.0.1:{self.debug_port}")
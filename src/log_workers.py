@@ -0,0 +1,303 @@
+"""
+Log ingestion in worker processes.
+
+With LOG_WORKERS > 0, containers are sharded over that many worker
+processes by name. Each worker tails and classifies the log files of its
+containers with the same LogMonitor code, and only sends back one JSON
+line per batch of lines read: the classified events, the last line for
+the startup embed, and the tail position. The bot's LogMonitor keeps
+handling events as usual, but a startup flood no longer competes with
+the Discord gateway for the event loop.
+
+Run as a script, this module is the worker: it reads `follow` and
+`unfollow` commands on stdin and writes messages on stdout.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import zlib
+
+from monitoring.checkpoint_store import CheckpointStore
+from monitoring.log_monitor import LogMonitor
+from monitoring.log_reader import LogReader
+
+# Longest message line, a batch of events from a 256 KiB read fits easily
+MESSAGE_LIMIT = 16 * 1024 * 1024
+
+
+class LogWorker:
+    """Bot-side handle of one worker process"""
+
+    restart_delay = 5.0
+    shutdown_timeout = 5.0
+
+    def __init__(self, index):
+        self.index = index
+        self.monitors = {}
+        self.process = None
+        self.restarts = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def spawn(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            os.path.abspath(__file__),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=MESSAGE_LIMIT,
+        )
+        logging.info(f"Log worker {self.index} started (pid {self.process.pid})")
+        for log_monitor in self.monitors.values():
+            self.send_follow(log_monitor)
+
+    async def run(self):
+        while True:
+            try:
+                await self.spawn()
+                await self.read_messages()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A broken pipe or an oversized line, start over with a new worker
+                logging.error(f"Log worker {self.index} failed: {e!r}")
+            finally:
+                await self.terminate()
+
+            for log_monitor in self.monitors.values():
+                log_monitor.worker_position = None
+            self.restarts += 1
+            logging.error(
+                f"Log worker {self.index} exited with "
+                f"{self.process.returncode if self.process else None}, "
+                f"restarting in {self.restart_delay}s"
+            )
+            await asyncio.sleep(self.restart_delay)
+
+    async def terminate(self):
+        """Close the worker's stdin so it flushes its checkpoints and exits"""
+        process = self.process
+        if process is None:
+            return
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+        await process.wait()
+
+    async def read_messages(self):
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                return
+            try:
+                message = json.loads(line)
+                log_monitor = self.monitors.get(message["container"])
+                if log_monitor is not None:
+                    await log_monitor.handle_worker_message(message)
+            except Exception as e:
+                logging.error(
+                    f"Failed to handle log worker {self.index} message {line[:200]!r}: {e!r}"
+                )
+
+    def send(self, command):
+        process = self.process
+        if process is None or process.returncode is not None:
+            # Sent again when the worker is spawned
+            return
+        process.stdin.write(json.dumps(command).encode() + b"\n")
+
+    def send_follow(self, log_monitor):
+        self.send(
+            {
+                "op": "follow",
+                "container": log_monitor.friendly_name,
+                "log_file": log_monitor.log_file,
+                "log_format": log_monitor.log_format,
+                "log_rules": log_monitor.log_rules,
+                "catchup_max_lines": log_monitor.catchup_max_lines,
+                "checkpoint_directory": os.path.dirname(log_monitor.checkpoint_store.path),
+            }
+        )
+
+
+class LogWorkerPool:
+    """Worker processes that containers are sharded over, started on demand"""
+
+    def __init__(self, size):
+        self.workers = [LogWorker(index) for index in range(size)]
+
+    def worker_for(self, name):
+        return self.workers[zlib.crc32(name.encode()) % len(self.workers)]
+
+    async def follow(self, log_monitor):
+        """Have a worker follow the log of `log_monitor` until cancelled"""
+        name = log_monitor.friendly_name
+        worker = self.worker_for(name)
+        worker.monitors[name] = log_monitor
+        worker.start()
+        worker.send_follow(log_monitor)
+        try:
+            await asyncio.Future()
+        finally:
+            if worker.monitors.get(name) is log_monitor:
+                del worker.monitors[name]
+                worker.send({"op": "unfollow", "container": name})
+            log_monitor.worker_position = None
+
+    async def stop(self):
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+
+
+class _ReadySignal:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def set(self):
+        self.callback()
+
+
+class WorkerLogMonitor(LogMonitor):
+    """LogMonitor that sends what it reads to the bot instead of Discord"""
+
+    def __init__(self, service, name, log_file, log_format, log_rules, catchup_max_lines):
+        super().__init__(
+            update_interval=0,
+            log_file=log_file,
+            channel=None,
+            docker_monitor=None,
+            friendly_name=name,
+            host=f"worker {os.getpid()}",
+            ready_event=_ReadySignal(lambda: self.send("ready")),
+            messager=None,
+            catchup_max_lines=catchup_max_lines,
+            log_rules=log_rules,
+            log_format=log_format,
+            log_reader=service.reader,
+        )
+        self.service = service
+
+    def send(self, op, **message):
+        self.service.write(
+            {
+                "container": self.friendly_name,
+                "op": op,
+                "position": self.position(),
+                "heartbeat_age": self.heartbeat_age(),
+                **message,
+            }
+        )
+
+    def checkpoint(self, inode, offset):
+        # Saved by the bot once it sent the events of the batch
+        pass
+
+    async def handle_log_lines(self, lines):
+        if not lines:
+            return
+        events = []
+        for record in self.record_parser.parse(lines):
+            event = self.classifier.classify(record.message)
+            if event is not None:
+                event.record = record
+                events.append(event.to_wire(self.classifier.rules))
+        self.send(
+            "batch",
+            lines=len(lines),
+            events=events,
+            last_line=lines[-1],
+        )
+
+
+class LogWorkerService:
+    """The worker process: follows the logs the bot asks for"""
+
+    status_interval = 5.0
+
+    def __init__(self):
+        self.reader = LogReader()
+        self.monitors = {}
+        self.tasks = {}
+
+    def write(self, message):
+        # Blocking on a full pipe holds the tailers back until the bot reads
+        sys.stdout.buffer.write(json.dumps(message).encode() + b"\n")
+        sys.stdout.buffer.flush()
+
+    def follow(self, command):
+        name = command["container"]
+        self.unfollow(name)
+        try:
+            log_monitor = WorkerLogMonitor(
+                self,
+                name,
+                command["log_file"],
+                command.get("log_format"),
+                command.get("log_rules"),
+                command.get("catchup_max_lines", 50),
+            )
+        except ValueError as e:
+            logging.error(f"Cannot follow the log of {name}: {e}")
+            return
+        if command.get("checkpoint_directory"):
+            log_monitor.checkpoint_store = CheckpointStore(name, command["checkpoint_directory"])
+        self.monitors[name] = log_monitor
+        self.tasks[name] = asyncio.create_task(log_monitor.start_monitoring())
+
+    def unfollow(self, name):
+        log_monitor = self.monitors.pop(name, None)
+        if log_monitor is not None:
+            log_monitor.stop_monitoring()
+            self.tasks.pop(name).cancel()
+
+    async def send_status(self):
+        """Heartbeats, which also carry the tail position for the health check"""
+        while True:
+            await asyncio.sleep(self.status_interval)
+            for log_monitor in self.monitors.values():
+                log_monitor.send("status")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stdin = asyncio.StreamReader(limit=MESSAGE_LIMIT)
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(stdin), sys.stdin
+        )
+        status_task = asyncio.create_task(self.send_status())
+        try:
+            # Until the bot closes the pipe
+            while line := await stdin.readline():
+                command = json.loads(line)
+                if command["op"] == "follow":
+                    self.follow(command)
+                elif command["op"] == "unfollow":
+                    self.unfollow(command["container"])
+        finally:
+            status_task.cancel()
+            tasks = list(self.tasks.values())
+            for name in list(self.monitors):
+                self.unfollow(name)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.reader.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.DEBUG if os.getenv("DEV", "false") == "true" else logging.INFO,
+        format=f"%(asctime)s:%(levelname)s:log_worker.{os.getpid()}: %(message)s",
+    )
+    asyncio.run(LogWorkerService().run())
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+from metrics import REGISTRY
+
+LOOP_LAG = REGISTRY.gauge(
+    "watchdog_event_loop_lag_seconds", "Event loop scheduling lag of the last probe"
+)
+LOOP_BLOCKED = REGISTRY.counter(
+    "watchdog_event_loop_blocked_total", "Callbacks that blocked the event loop too long"
+)
+
+
+class SlowCallback:
+    __slots__ = ("started_at", "duration", "stack")
+
+    def __init__(self, started_at, duration, stack):
+        self.started_at = started_at
+        self.duration = duration
+        self.stack = stack
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at,
+            "duration": round(self.duration, 4),
+            "stack": self.stack,
+        }
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task sleeping `interval`
+    seconds. Anything blocking the loop (a slow regex, a synchronous call)
+    shows up as lag once the loop gets control back.
+
+    A watchdog thread notices when the loop has not ticked for
+    `slow_callback_threshold` seconds and captures the loop thread's stack
+    while it is still blocked, so the culprit is recorded and not just its
+    duration.
+    """
+
+    def __init__(self, interval=0.5, window=60.0, slow_callback_threshold=0.25):
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.lag = 0.0
+        self.last_tick = None
+        self.slow_callbacks = deque(maxlen=20)
+        self._recent = deque(maxlen=max(1, int(window / interval)))
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+        self._loop_thread_id = None
+        self._expected_tick = None
+        self._current_stall = None
+
+    @property
+    def max_lag(self):
+        """Worst lag over the last `window` seconds"""
+        return max(self._recent, default=0.0)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._loop_thread_id = threading.get_ident()
+            self._task = asyncio.create_task(self._run())
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._stopped.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            self._expected_tick = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - started_at - self.interval)
+            self.last_tick = time.monotonic()
+            self._expected_tick = None
+            self._recent.append(self.lag)
+            LOOP_LAG.set(self.lag)
+
+            stall, self._current_stall = self._current_stall, None
+            if stall is not None:
+                stall.duration = self.lag
+                logging.warning(
+                    f"Event loop was blocked for {self.lag:.2f}s in:\n{''.join(stall.stack)}"
+                )
+            elif self.lag > 1.0:
+                logging.warning(f"Event loop was blocked for {self.lag:.2f}s")
+
+    def _loop_stack(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return traceback.format_stack(frame) if frame is not None else []
+
+    def _watch(self):
+        """Watchdog thread: capture the loop's stack while it is blocked"""
+        while not self._stopped.wait(self.slow_callback_threshold / 2):
+            expected = self._expected_tick
+            if expected is None or self._current_stall is not None:
+                continue
+            overdue = time.monotonic() - expected
+            if overdue < self.slow_callback_threshold:
+                continue
+
+            stall = SlowCallback(time.time() - overdue, overdue, self._loop_stack())
+            if self._expected_tick is not expected:
+                # The loop caught up while the stack was being captured
+                continue
+            self._current_stall = stall
+            self.slow_callbacks.append(stall)
+            LOOP_BLOCKED.inc()
+
+    def profile(self, duration=5.0, interval=0.005, limit=50):
+        """
+        Sample the loop thread's stack every `interval` seconds for `duration`
+        seconds. Blocking, run it in a thread. Returns (count, stack) pairs of
+        the most frequent stacks in collapsed format, outermost frame first.
+        """
+        samples = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                frames = traceback.extract_stack(frame)
+                samples[
+                    ";".join(f"{f.name} ({f.filename}:{f.lineno})" for f in frames)
+                ] += 1
+            time.sleep(interval)
+        return [(count, stack) for stack, count in samples.most_common(limit)]
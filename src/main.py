@@ -1,10 +1,15 @@
 import asyncio
 import logging
+import signal
 from init import init
 from app import App
 
 
 async def main():
+    # `docker stop`: unwind through App's shutdown, which saves checkpoints
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, asyncio.current_task().cancel
+    )
     try:
         envvars, container_configs = init()
 
@@ -16,6 +21,8 @@ async def main():
     except ValueError as e:
         logging.error(f"Initialization error: {e}")
         return
+    except asyncio.CancelledError:
+        logging.info("Stopped by SIGTERM")
 
 
 if __name__ == "__main__":
@@ -1,18 +1,93 @@
+import asyncio
+import logging
 import discord
 
 
 class Messager:
 
-    def __init__(self, channel):
+    def __init__(self, channel, rate_scheduler=None, key=None, edit_interval=2.0):
         self.channel = channel
+        self.rate_scheduler = rate_scheduler
+        self.key = key
         self.kept_messages = []
+        self.edit_interval = edit_interval
+        self.edits_sent = 0
+        self.edits_skipped = 0
+        self._pending_edit = None
+        self._kept_generation = 0
+        self._last_edit = 0.0
+        self._flusher = None
+
+    async def wait_for_turn(self):
+        """Wait for a token of this channel's outbound rate budget."""
+        if self.rate_scheduler:
+            await self.rate_scheduler.acquire(self.channel.id, self.key)
+
+    def can_send_update(self):
+        """Whether an optional update fits in the channel's budget right now."""
+        if not self.rate_scheduler:
+            return True
+        return self.rate_scheduler.can_send_update(self.channel.id, self.key)
+
+    def release_updates(self):
+        """Tell the scheduler this sender has no more optional updates."""
+        if self.rate_scheduler:
+            self.rate_scheduler.release(self.channel.id, self.key)
 
     async def send_embed(
         self, title="", description="", footer="", color=0x0000FF, keep=False
     ):
         """Send an embed message to a Discord channel or modify the last kept message."""
+        if keep:
+            # A state change supersedes any debounced update still pending
+            self._pending_edit = None
+            self._kept_generation += 1
+        await self._send_embed(title, description, footer, color, keep)
+
+    async def debounce_embed(self, title="", description="", footer="", color=0x0000FF):
+        """
+        Latest-value update of the kept embed. Only the most recent state is
+        kept in memory and a single flusher pushes at most one edit every
+        `edit_interval` seconds.
+        """
+        if self._pending_edit is not None:
+            self.edits_skipped += 1
+        self._pending_edit = (title, description, footer, color)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_edits())
+
+    async def _flush_edits(self):
+        loop = asyncio.get_running_loop()
+        while self._pending_edit is not None:
+            delay = self._last_edit + self.edit_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if not self.can_send_update():
+                await asyncio.sleep(0.25)
+                continue
+
+            pending, self._pending_edit = self._pending_edit, None
+            if pending is None:
+                break
+            self._last_edit = loop.time()
+            self.edits_sent += 1
+            try:
+                await self._send_embed(
+                    *pending, keep=True, generation=self._kept_generation
+                )
+            except Exception as e:
+                logging.error(f"Failed to push debounced embed for {self.key}: {e}")
+
+    async def _send_embed(
+        self, title, description, footer, color, keep, generation=None
+    ):
         if keep and self.kept_messages:
             last_message = self.kept_messages[-1]
+            await self.wait_for_turn()
+            if generation is not None and generation != self._kept_generation:
+                # A state change was sent while this debounced edit waited
+                return
             embed = self.modify_embed(
                 last_message.embeds[0],
                 title=title,
@@ -29,12 +104,14 @@ class Messager:
             description=description,
         )
         embed.set_footer(text=footer)
+        await self.wait_for_turn()
         message = await self.channel.send(embed=embed)
         if keep:
             self.kept_messages.append(message)
 
     async def send_message(self, text):
         """Send a text message to a Discord channel."""
+        await self.wait_for_turn()
         await self.channel.send(text)
 
     def clear_kept_messages(self):
@@ -55,5 +132,6 @@ class Messager:
 
     async def modify_message(self, message, new_content):
         """Modify the content of an existing text message."""
+        await self.wait_for_turn()
         await message.edit(content=new_content)
         return message
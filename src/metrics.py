@@ -0,0 +1,188 @@
+import math
+import threading
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return f"{{{inner}}}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def remove(self, **labels):
+        """
+        Forget every label combination matching `labels`, e.g. all the
+        series of a container that was removed. Other labels can be omitted.
+        """
+        indexes = [
+            (self.labelnames.index(name), str(value)) for name, value in labels.items()
+        ]
+        with self._lock:
+            for key in [
+                key
+                for key in self._values
+                if all(key[index] == value for index, value in indexes)
+            ]:
+                del self._values[key]
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(dict(zip(self.labelnames, key)), value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_sample(self, labels, value):
+        counts, total = value
+        lines = [
+            f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}"
+            for bound, count in zip(self.buckets, counts)
+        ]
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Metrics rendered in the Prometheus text exposition format. Collectors are
+    called at scrape time for values that are cheaper to read than to track,
+    such as queue depths; they return metrics built for that scrape.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), **kwargs):
+        return self._add(Histogram(name, documentation, labelnames, **kwargs))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+LOG_LINES = REGISTRY.counter(
+    "watchdog_log_lines_total", "Log lines read", ["container"]
+)
+LOG_EVENTS = REGISTRY.counter(
+    "watchdog_log_events_total", "Log lines classified as events", ["container", "event"]
+)
+RCON_LATENCY = REGISTRY.histogram(
+    "watchdog_rcon_command_seconds", "RCON command round trip time", ["server", "command"]
+)
+RCON_ERRORS = REGISTRY.counter(
+    "watchdog_rcon_errors_total", "Failed RCON commands", ["server", "error"]
+)
+DISCORD_LATENCY = REGISTRY.histogram(
+    "watchdog_discord_request_seconds",
+    "Discord message request time",
+    ["operation"],
+)
+DISCORD_RATE_LIMITED = REGISTRY.counter(
+    "watchdog_discord_rate_limited_total", "Discord 429 responses", ["channel"]
+)
+DOCKER_EVENTS = REGISTRY.counter(
+    "watchdog_docker_events_total", "Docker events received", ["container", "action"]
+)
+
+
+def remove_container_series(name, host):
+    """Drop the series of a container, keyed by its name or its host"""
+    LOG_LINES.remove(container=name)
+    LOG_EVENTS.remove(container=name)
+    DOCKER_EVENTS.remove(container=host)
+    RCON_LATENCY.remove(server=host)
+    RCON_ERRORS.remove(server=host)
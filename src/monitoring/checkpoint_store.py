@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+
+
+class CheckpointStore:
+    """
+    Persist the tail position (inode and byte offset) of one container's log
+    file so a restarted bot resumes where it stopped. Updates are kept in
+    memory and written at most once every `flush_interval` seconds; the
+    last one of a burst is written by a timer once the interval is over.
+    """
+
+    def __init__(self, name, directory="/app/monitoring", flush_interval=5.0):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        self.path = os.path.join(directory, f"{safe_name}.checkpoint.json")
+        self.flush_interval = flush_interval
+        self.inode = None
+        self.offset = None
+        self.updated_at = None
+        self._dirty = False
+        self._last_flush = 0.0
+        self._timer = None
+
+    def load(self):
+        """Return the saved checkpoint as a dict, or None if there is none."""
+        try:
+            with open(self.path, "r") as file:
+                checkpoint = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+        self.inode = checkpoint.get("inode")
+        self.offset = checkpoint.get("offset")
+        self.updated_at = checkpoint.get("updated_at")
+        return checkpoint
+
+    def update(self, inode, offset):
+        """Record a new position; it is written on the next flush."""
+        if inode == self.inode and offset == self.offset:
+            return
+        self.inode = inode
+        self.offset = offset
+        self.updated_at = time.time()
+        self._dirty = True
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        """Flush if the batching interval has elapsed, otherwise schedule it."""
+        if not self._dirty:
+            return
+        delay = self._last_flush + self.flush_interval - time.monotonic()
+        if delay <= 0:
+            self.flush()
+        elif self._timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._timer = loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """Atomically write the current position to disk."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(
+                    {
+                        "inode": self.inode,
+                        "offset": self.offset,
+                        "updated_at": self.updated_at,
+                    },
+                    file,
+                )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logging.error(f"Failed to write checkpoint {self.path}: {e}")
+        self._last_flush = time.monotonic()
@@ -3,6 +3,9 @@ Minecraft Death Messages Database
 Extracted from https://minecraft.wiki/w/Death_messages
 """
 
+import re
+from typing import NamedTuple, Optional
+
 # Standard death message patterns with placeholders:
 # <player> = player name
 # <player/mob> = player or mob name 
@@ -192,12 +195,114 @@ PLAYER_PATTERN = r"[A-Za-z0-9_]+"
 ENTITY_PATTERN = r"[A-Za-z0-9_ ]+"
 ITEM_PATTERN = r"[A-Za-z0-9_ ]+"
 
-def _create_regex_pattern(death_msg):
-    """Create a regex pattern from a death message template."""
-    pattern = death_msg.replace("<player>", PLAYER_PATTERN)
-    pattern = pattern.replace("<player/mob>", ENTITY_PATTERN)
-    pattern = pattern.replace("<item>", ITEM_PATTERN)
-    return f"^{pattern}$"
+
+_PLACEHOLDER_RE = re.compile(r"<player>|<player/mob>|<item>")
+
+
+class DeathMatch(NamedTuple):
+    """Result of matching a line against the death message database."""
+
+    category: str
+    template: str
+    victim: str
+    killer: Optional[str]
+    item: Optional[str]
+
+
+def _create_regex_pattern(death_msg, index):
+    """
+    Create a regex pattern from a death message template.
+
+    The killer and item placeholders become named groups suffixed with the
+    template index so that all templates can share one combined pattern.
+    """
+    parts = []
+    position = 0
+    for placeholder in _PLACEHOLDER_RE.finditer(death_msg):
+        parts.append(re.escape(death_msg[position : placeholder.start()]))
+        token = placeholder.group()
+        if token == "<player>":
+            parts.append(PLAYER_PATTERN)
+        elif token == "<player/mob>":
+            parts.append(f"(?P<killer{index}>{ENTITY_PATTERN})")
+        else:
+            parts.append(f"(?P<item{index}>{ITEM_PATTERN})")
+        position = placeholder.end()
+    parts.append(re.escape(death_msg[position:]))
+    return f"^{''.join(parts)}$"
+
+
+def _build_matcher():
+    """
+    Compile every template into a single anchored alternation.
+
+    Each template gets its own wrapping group; since it is the last group to
+    close when its branch matches, ``match.lastindex`` identifies the template
+    without scanning the group dict.
+    """
+    templates = [
+        (category, death_msg)
+        for category, messages in MINECRAFT_DEATH_MESSAGES.items()
+        for death_msg in messages
+    ]
+    # Try the most specific templates first so "slain by <player/mob> using
+    # <item>" wins over "slain by <player/mob>" and the item is captured.
+    templates.sort(key=lambda entry: -len(_PLACEHOLDER_RE.sub("", entry[1])))
+
+    branches = []
+    for index, (category, death_msg) in enumerate(templates):
+        # Every template starts with "<player> ", which is hoisted into the
+        # shared victim group below.
+        suffix = _create_regex_pattern(death_msg[len("<player> ") :], index)
+        branches.append(f"(?P<t{index}>{suffix[1:-1]})")
+
+    pattern = re.compile(
+        f"^(?P<victim>{PLAYER_PATTERN}) (?:{'|'.join(branches)})$"
+    )
+
+    by_group = {}
+    for index, (category, death_msg) in enumerate(templates):
+        by_group[pattern.groupindex[f"t{index}"]] = (
+            category,
+            death_msg,
+            pattern.groupindex.get(f"killer{index}"),
+            pattern.groupindex.get(f"item{index}"),
+        )
+    return pattern, by_group
+
+
+_DEATH_PATTERN, _TEMPLATES_BY_GROUP = _build_matcher()
+
+
+def match_death_message(message):
+    """
+    Match a message against every death message template in a single pass.
+
+    Args:
+        message (str): The message to check
+
+    Returns:
+        DeathMatch or None: The category, template, victim, killer and item of
+        the first matching template, None if the message is not a death message
+    """
+    if not message:
+        return None
+
+    match = _DEATH_PATTERN.match(message.strip())
+    if match is None:
+        return None
+
+    category, template, killer_group, item_group = _TEMPLATES_BY_GROUP[
+        match.lastindex
+    ]
+    return DeathMatch(
+        category=category,
+        template=template,
+        victim=match.group("victim"),
+        killer=match.group(killer_group) if killer_group else None,
+        item=match.group(item_group) if item_group else None,
+    )
+
 
 def is_death_message(message):
     """
@@ -209,15 +314,7 @@ def is_death_message(message):
     Returns:
         bool: True if the message appears to be a death message
     """
-    import re
-    message = message.strip()
-    
-    for death_msg in ALL_DEATH_MESSAGES:
-        pattern = _create_regex_pattern(death_msg)
-        if re.match(pattern, message):
-            return True
-    
-    return False
+    return match_death_message(message) is not None
 
 def get_death_message_category(message):
     """
@@ -229,15 +326,8 @@ def get_death_message_category(message):
     Returns:
         str or None: The category name if found, None otherwise
     """
-    import re
-    
-    for category, messages in MINECRAFT_DEATH_MESSAGES.items():
-        for death_msg in messages:
-            pattern = _create_regex_pattern(death_msg)
-            if re.match(pattern, message):
-                return category
-    
-    return None
+    death = match_death_message(message)
+    return death.category if death else None
 
 # Example usage:
 if __name__ == "__main__":
@@ -257,4 +347,4 @@ if __name__ == "__main__":
         print(f"'{msg}' -> Death: {is_death}, Category: {category}")
     
     print(f"\nTotal death messages: {len(ALL_DEATH_MESSAGES)}")
-    print(f"Total categories: {len(MINECRAFT_DEATH_MESSAGES)}")
\ No newline at end of file
+    print(f"Total categories: {len(MINECRAFT_DEATH_MESSAGES)}")
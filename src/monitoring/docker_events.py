@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import random
+import time
+
+from docker_client import DockerAPIError, DockerClient
+from metrics import DOCKER_EVENTS
+
+
+class DockerEventHub:
+    """
+    One Docker event subscription shared by every DockerMonitor. Events are
+    dispatched by container name, so watching another container only adds an
+    entry to the handler map and never opens a new connection to the daemon.
+
+    When the stream breaks it reconnects with exponential backoff and jitter,
+    replays what it missed with `since`, then reconciles every handler with
+    the container's actual state.
+    """
+
+    def __init__(self, client: DockerClient, max_backoff=60):
+        self.client = client
+        self.handlers = {}
+        self.connected = asyncio.Event()
+        self.events_received = 0
+        self.reconnects = 0
+        self.max_backoff = max_backoff
+        self.last_event_nano = None
+        self.connected_at = None
+        self.disconnected_at = time.monotonic()
+        self._task = None
+        self._dispatch_tasks = set()
+
+    def register(self, container_name, handler):
+        """Dispatch events of `container_name` to `handler.handle_docker_event`."""
+        self.handlers[container_name] = handler
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.monitor_docker_events())
+        elif self.connected.is_set():
+            self._spawn(self.reconcile(container_name))
+
+    def unregister(self, container_name):
+        self.handlers.pop(container_name, None)
+
+    def _since(self):
+        """`since` of the next subscription: just after the last event seen"""
+        if self.last_event_nano is None:
+            return None
+        seconds, nanos = divmod(self.last_event_nano + 1, 1_000_000_000)
+        return f"{seconds}.{nanos:09d}"
+
+    def _backoff(self, failures):
+        delay = min(self.max_backoff, 2 ** min(failures, 16))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def monitor_docker_events(self):
+        """Follow the daemon's container start/die events"""
+        failures = 0
+        while True:
+            try:
+                async with self.client.events(
+                    filters={"type": ["container"], "event": ["start", "die"]},
+                    since=self._since(),
+                ) as events:
+                    logging.info(
+                        f"Starting Docker event monitoring for {', '.join(self.handlers)}"
+                    )
+                    failures = 0
+                    self.connected_at = time.monotonic()
+                    self.disconnected_at = None
+                    self.connected.set()
+                    self._spawn(self.reconcile_all(delay=1.0))
+                    async for event in events:
+                        self.dispatch(event)
+                logging.warning("Docker event stream closed by the daemon")
+
+            except asyncio.CancelledError:
+                raise
+
+            except DockerAPIError as e:
+                logging.error(f"Docker client error: {e}")
+
+            except Exception as e:
+                logging.error(f"Docker monitoring error: {e}")
+
+            self.connected.clear()
+            self.connected_at = None
+            self.disconnected_at = time.monotonic()
+            self.reconnects += 1
+            delay = self._backoff(failures)
+            failures += 1
+            logging.info(f"Reconnecting to the Docker event stream in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def reconcile_all(self, delay=0.0):
+        """
+        Check every watched container against its actual state. The delay
+        lets the events replayed through `since` be handled first.
+        """
+        await asyncio.sleep(delay)
+        await asyncio.gather(
+            *(self.reconcile(name) for name in list(self.handlers)),
+            return_exceptions=True,
+        )
+
+    async def reconcile(self, container_name):
+        """Let a handler correct itself from the container's inspect state"""
+        handler = self.handlers.get(container_name)
+        if handler is None:
+            return
+        try:
+            state = (await self.client.inspect(container_name)).get("State", {})
+        except DockerAPIError as e:
+            logging.warning(f"Could not inspect {container_name}: {e}")
+            return
+        await handler.reconcile_docker_state(state)
+
+    def dispatch(self, event):
+        """Hand an event to the handler of its container, if it is watched"""
+        time_nano = event.get("timeNano")
+        if time_nano:
+            self.last_event_nano = max(self.last_event_nano or 0, time_nano)
+
+        container_name = event.get("Actor", {}).get("Attributes", {}).get("name", "")
+        handler = self.handlers.get(container_name)
+        if handler is None:
+            return
+
+        self.events_received += 1
+        DOCKER_EVENTS.inc(container=container_name, action=event.get("Action", ""))
+        self._spawn(handler.handle_docker_event(event))
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
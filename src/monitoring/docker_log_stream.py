@@ -0,0 +1,241 @@
+import asyncio
+import calendar
+import logging
+import struct
+import time
+
+import aiohttp
+
+from docker_client import DockerAPIError, DockerNotFound
+
+# stream type (0 stdin, 1 stdout, 2 stderr), 3 padding bytes, payload size
+FRAME_HEADER = struct.Struct(">BxxxL")
+
+# Docker's log copier splits longer messages, each part with its timestamp
+PARTIAL_SIZE = 16 * 1024
+
+
+class FrameDemuxer:
+    """
+    Incremental decoder of Docker's multiplexed log format, used when the
+    container has no TTY: every write is an 8-byte header followed by its
+    payload. Chunks can end anywhere, partial frames wait for the next one.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """(stream, payload) of every frame completed by `data`"""
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        offset = 0
+        while len(buffer) - offset >= FRAME_HEADER.size:
+            stream, size = FRAME_HEADER.unpack_from(buffer, offset)
+            end = offset + FRAME_HEADER.size + size
+            if end > len(buffer):
+                break
+            frames.append((stream, bytes(buffer[offset + FRAME_HEADER.size : end])))
+            offset = end
+        del buffer[:offset]
+        return frames
+
+
+class TimestampParser:
+    """RFC 3339 timestamps of `docker logs --timestamps` as nanoseconds"""
+
+    def __init__(self):
+        self._seconds = None
+        self._epoch = 0
+
+    def parse(self, stamp):
+        seconds, _, fraction = stamp.rstrip("Z").partition(".")
+        # Consecutive lines mostly share their second, skip strptime for them
+        if seconds != self._seconds:
+            self._epoch = calendar.timegm(time.strptime(seconds, "%Y-%m-%dT%H:%M:%S"))
+            self._seconds = seconds
+        return self._epoch * 1_000_000_000 + int(fraction[:9].ljust(9, "0"))
+
+
+class DockerLogStream:
+    """
+    Follow a container's output through the Docker logs API instead of a
+    mounted log file. Lines are pushed by the daemon as soon as they are
+    written, and the daemon can be remote.
+
+    Lines are requested with their timestamps. The last one is the
+    checkpoint, stored with the container id in place of the file's inode:
+    a reconnection, or a restarted bot, resumes with `since` and skips what
+    it already saw. Without a checkpoint for this container it starts at
+    the end, otherwise it replays at most `catchup_max_lines` lines.
+    """
+
+    min_backoff = 1.0
+    max_backoff = 10.0
+
+    def __init__(self, client, container, checkpoint_store, catchup_max_lines=50):
+        self.client = client
+        self.container = container
+        self.checkpoint_store = checkpoint_store
+        self.catchup_max_lines = catchup_max_lines
+        self.container_id = None
+        self.tty = None
+        self.last_timestamp = None
+        self.connected = False
+        self.reconnects = 0
+        self._buffers = {}
+        self._timestamps = TimestampParser()
+        self._heartbeat = time.monotonic()
+
+    @property
+    def heartbeat(self):
+        """Now while connected, else the end of the last attempt"""
+        return time.monotonic() if self.connected else self._heartbeat
+
+    def _resume_params(self):
+        """`since` and `tail` of the next logs request"""
+        if self.last_timestamp is None:
+            store = self.checkpoint_store
+            if store.inode is None:
+                store.load()
+            if store.inode != self.container_id or store.offset is None:
+                # Another container, or the first run: start at the end
+                return None, 0
+            self.last_timestamp = store.offset
+            tail = max(0, self.catchup_max_lines)
+        else:
+            tail = None
+        seconds, nanos = divmod(self.last_timestamp, 1_000_000_000)
+        return f"{seconds}.{nanos:09d}", tail
+
+    def _parse_timestamp(self, stamp):
+        try:
+            return self._timestamps.parse(stamp.decode("ascii"))
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+    def _seen(self, timestamp):
+        # `since` is inclusive, and a reconnect may replay the last lines
+        return (
+            timestamp is not None
+            and self.last_timestamp is not None
+            and timestamp <= self.last_timestamp
+        )
+
+    @staticmethod
+    def _decode(raw):
+        return raw.rstrip(b"\r").decode("utf-8", errors="replace")
+
+    def _join_partials(self, line, timestamp):
+        """
+        Remove the timestamps Docker inserted every PARTIAL_SIZE bytes of a
+        long TTY line, returning it with the timestamp of its last part.
+        """
+        parts = []
+        while len(line) > PARTIAL_SIZE:
+            stamp, space, rest = line[PARTIAL_SIZE:].partition(b" ")
+            part_timestamp = self._parse_timestamp(stamp) if space else None
+            if part_timestamp is None:
+                break
+            parts.append(line[:PARTIAL_SIZE])
+            line, timestamp = rest, part_timestamp
+        parts.append(line)
+        return b"".join(parts), timestamp
+
+    def _tty_lines(self, data):
+        """Complete lines of a raw TTY stream, each starts with its timestamp"""
+        *complete, self._buffers[1] = (self._buffers.get(1, b"") + data).split(b"\n")
+        lines = []
+        for raw in complete:
+            stamp, _, line = raw.partition(b" ")
+            timestamp = self._parse_timestamp(stamp)
+            if timestamp is None:
+                lines.append(self._decode(raw))
+                continue
+            line, timestamp = self._join_partials(line, timestamp)
+            if self._seen(timestamp):
+                continue
+            self.last_timestamp = timestamp
+            lines.append(self._decode(line))
+        return lines
+
+    def _frame_lines(self, stream, payload):
+        """
+        Complete lines of a multiplexed frame. Every frame starts with its
+        timestamp, and Docker splits messages longer than 16 KB over several
+        frames, so partial lines wait for the rest of the message.
+        """
+        stamp, _, text = payload.partition(b" ")
+        timestamp = self._parse_timestamp(stamp)
+        if timestamp is None:
+            text = payload
+        elif self._seen(timestamp):
+            return []
+        *complete, self._buffers[stream] = (self._buffers.get(stream, b"") + text).split(b"\n")
+        if complete and timestamp is not None:
+            # Resuming from here replays a line left incomplete in full
+            self.last_timestamp = timestamp
+        return [self._decode(raw) for raw in complete]
+
+    async def follow(self):
+        """
+        Yield batches of lines until cancelled, reconnecting when the
+        stream ends (the container stopped) or fails. An empty batch is
+        yielded each time the stream is established.
+        """
+        failures = 0
+        while True:
+            try:
+                info = await self.client.inspect(self.container)
+                self.container_id = info["Id"]
+                self.tty = info["Config"].get("Tty", False)
+                since, tail = self._resume_params()
+                async with self.client.logs(
+                    self.container, follow=True, since=since, tail=tail, timestamps=True
+                ) as content:
+                    self.connected = True
+                    self._buffers.clear()
+                    # Quiet while polling a stopped container
+                    logging.log(
+                        logging.DEBUG if failures else logging.INFO,
+                        f"Following Docker logs of {self.container}"
+                        f"{' (tty)' if self.tty else ''} since {since or 'now'}",
+                    )
+                    yield []
+
+                    received = False
+                    demuxer = None if self.tty else FrameDemuxer()
+                    async for data in content.iter_any():
+                        received = True
+                        if demuxer is None:
+                            lines = self._tty_lines(data)
+                        else:
+                            lines = []
+                            for stream, payload in demuxer.feed(data):
+                                lines.extend(self._frame_lines(stream, payload))
+                        if lines:
+                            yield lines
+                # Back off while the container stays stopped
+                failures = 0 if received else failures + 1
+                logging.log(
+                    logging.DEBUG if failures else logging.INFO,
+                    f"Docker log stream of {self.container} ended",
+                )
+
+            except DockerNotFound:
+                logging.log(
+                    logging.DEBUG if failures else logging.WARNING,
+                    f"Container {self.container} not found, waiting...",
+                )
+                failures += 1
+            except (DockerAPIError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                logging.warning(f"Docker log stream of {self.container} failed: {e}")
+                failures += 1
+            finally:
+                # Retrying is a sign of life too, `connected` tells if it works
+                self._heartbeat = time.monotonic()
+                self.connected = False
+
+            self.reconnects += 1
+            await asyncio.sleep(min(self.max_backoff, self.min_backoff * 2 ** min(failures, 8)))
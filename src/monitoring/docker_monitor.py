@@ -1,10 +1,7 @@
 import asyncio
 import logging
-import docker
-from docker.errors import DockerException
-from concurrent.futures import ThreadPoolExecutor
 from messager import Messager
-from monitoring.turn_manager import TurnManager
+from monitoring.docker_events import DockerEventHub
 
 
 class DockerMonitor:
@@ -15,55 +12,37 @@ class DockerMonitor:
         friendly_name,
         ready_event,
         messager: Messager,
+        docker_events: DockerEventHub,
+        roster=None,
+        event_queue=None,
+        on_server_start=None,
     ):
         self.container_name = container_name
         self.channel = channel
         self.friendly_name = friendly_name
         self.ready_event = ready_event
         self.messager = messager
-        self.client = None
+        self.docker_events = docker_events
+        self.roster = roster
+        # Shared with the log monitor, so state changes keep their order
+        self.event_queue = event_queue
+        # Called on a container start and once the server is ready
+        self.on_server_start = on_server_start
         self.waiting_for_startup = False
-        self.executor = ThreadPoolExecutor(max_workers=1)
-        self.loop = None
-        self.turn_manager = None
+        self.startup_started_at = None
+        # Last known container state: None until the first event or inspect
+        self.running = None
 
     async def start_monitoring(self):
-        """Start monitoring Docker events"""
-        self.loop = asyncio.get_event_loop()
-
-        if self.loop:
-            await self.loop.run_in_executor(self.executor, self.monitor_docker_events)
-
-    def monitor_docker_events(self):
-        """Monitor Docker events in a separate thread"""
-        while True:
-            try:
-                self.client = docker.from_env()
-                logging.info(
-                    f"Starting Docker event monitoring for {self.container_name}"
-                )
-                if self.ready_event:
-                    self.ready_event.set()
-
-                for event in self.client.events(
-                    decode=True,
-                    filters={
-                        "container": self.container_name,
-                        "event": ["start", "die"],
-                    },
-                ):
-                    if self.loop:
-                        asyncio.run_coroutine_threadsafe(
-                            self.handle_docker_event(event), self.loop
-                        )
-
-            except DockerException as e:
-                logging.error(f"Docker client error: {e}")
-                import time
-
-            except Exception as e:
-                logging.error(f"Docker monitoring error: {e}")
-                import time
+        """Subscribe to this container's events on the shared Docker stream"""
+        self.docker_events.register(self.container_name, self)
+        await self.docker_events.connected.wait()
+        if self.ready_event:
+            self.ready_event.set()
+
+    def stop_monitoring(self):
+        """Stop receiving this container's Docker events"""
+        self.docker_events.unregister(self.container_name)
 
     async def handle_docker_event(self, event):
         """Handle Docker container events"""
@@ -73,42 +52,96 @@ class DockerMonitor:
         if container_name != self.container_name:
             return
 
+        # Replayed events and reconciliation can report the same change twice
+        if (action == "start" and self.running is True) or (
+            action == "die" and self.running is False
+        ):
+            logging.debug(f"Ignoring duplicate {action} event for {container_name}")
+            return
+        if action in ("die", "start"):
+            self.running = action == "start"
+
+        if action in ("die", "start") and self.roster is not None:
+            self.roster.reset()
+
         if action == "die":
-            await self.messager.send_embed(
-                "Le serveur s'arrête.",
-                description="",
-                footer=self.friendly_name,
-                color=0xFF0000,
-                keep=True,
-            )
             logging.info(f"Container {container_name} stopped")
             self.waiting_for_startup = False
-            # Remove from turn rotation if it was in startup
-            if self.turn_manager:
-                TurnManager.remove_manager(self.turn_manager)
-                logging.info(
-                    f"Removed {self.friendly_name} from turn rotation on container stop"
-                )
-            # self.messager.clear_kept_messages()
+            await self.send_state_embed("stopped", self.send_stopped)
 
         elif action == "start":
-            await self.messager.send_embed(
-                "Le serveur démarre.",
-                footer=self.friendly_name,
-                color=0xFFFF00,
-                keep=True,
-            )
             logging.info(f"Container {container_name} started")
             self.waiting_for_startup = True
-            self.turn_manager = TurnManager()
+            self.startup_started_at = asyncio.get_event_loop().time()
+            if self.on_server_start:
+                self.on_server_start()
+            await self.send_state_embed("started", self.send_started)
+
+    async def send_state_embed(self, kind, send):
+        """
+        Queue a state change behind the log events read before it. Startup
+        progress still waiting is outdated and must not edit the new embed.
+        """
+        if self.event_queue is None:
+            await send()
+            return
+        self.event_queue.discard_droppable()
+        await self.event_queue.put(kind, send)
+
+    async def send_stopped(self):
+        await self.messager.send_embed(
+            "Le serveur s'arrête.",
+            description="",
+            footer=self.friendly_name,
+            color=0xFF0000,
+            keep=True,
+        )
+        self.messager.release_updates()
+        # self.messager.clear_kept_messages()
+
+    async def send_started(self):
+        await self.messager.send_embed(
+            "Le serveur démarre.",
+            footer=self.friendly_name,
+            color=0xFFFF00,
+            keep=True,
+        )
+
+    async def reconcile_docker_state(self, state):
+        """Correct the known state from `docker inspect` after a reconnect"""
+        running = bool(state.get("Running"))
+        if self.running is None:
+            self.running = running
+            return
+        if running == self.running:
+            return
+
+        logging.warning(
+            f"Missed Docker events for {self.container_name}, now {'running' if running else 'stopped'}"
+        )
+        await self.handle_docker_event(
+            {
+                "Action": "start" if running else "die",
+                "Actor": {"Attributes": {"name": self.container_name}},
+            }
+        )
+
+    def startup_elapsed(self):
+        """Seconds since the container started, 0 if the start was not seen"""
+        if self.startup_started_at is None:
+            return 0.0
+        return asyncio.get_event_loop().time() - self.startup_started_at
 
     def notify_server_ready(self):
         """Called by log monitor when server is ready"""
         logging.info(
             f"notify_server_ready called - waiting_for_startup: {self.waiting_for_startup}"
         )
+        if self.on_server_start:
+            self.on_server_start()
         if self.waiting_for_startup:
             self.waiting_for_startup = False
+            self.messager.release_updates()
             logging.info("Server startup flag cleared (message sent by log monitor)")
         else:
             logging.info("Server ready notification skipped - not waiting for startup")
@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import logging
+from collections import deque
+
+
+class QueuedEvent:
+    __slots__ = ("kind", "send", "droppable", "sequence")
+
+    def __init__(self, kind, send, droppable):
+        self.kind = kind
+        self.send = send
+        self.droppable = droppable
+        self.sequence = None
+
+
+class EventQueue:
+    """
+    Bounded queue between log parsing and Discord sends, drained by a single
+    consumer task so that a slow or rate limited channel never stalls the
+    log reader.
+
+    Overflow policy:
+    - droppable events (startup progress) are merged: a new one replaces the
+      one still waiting, and they are dropped outright when the queue is full;
+    - other events (joins, chat, deaths...) are never dropped. When the queue
+      is full they evict a waiting droppable event, or wait for free space.
+
+    `when_sent` runs a callback once every event queued before it has been
+    sent, which is when the log position behind them can be checkpointed.
+    """
+
+    def __init__(self, name, maxsize=256):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = deque()
+        self._pending_droppable = None
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._task = None
+        self._sequence = 0
+        self._sending = None
+        # (sequence of the last event queued before, callback)
+        self._callbacks = deque()
+        self._blocked_puts = 0
+
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.merged = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    @property
+    def blocked(self):
+        """Whether a producer is waiting for free space"""
+        return self._blocked_puts > 0
+
+    def start(self):
+        """Start the consumer task if it is not already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._sending = None
+
+    async def put(self, kind, send, droppable=False):
+        """Queue `send`, a coroutine function called without arguments."""
+        event = QueuedEvent(kind, send, droppable)
+
+        if droppable:
+            if self._pending_droppable is not None:
+                self._queue.remove(self._pending_droppable)
+                self.merged += 1
+            elif len(self._queue) >= self.maxsize:
+                self.dropped += 1
+                logging.debug(f"Event queue full for {self.name}, dropped {kind}")
+                return
+            self._pending_droppable = event
+        else:
+            while len(self._queue) >= self.maxsize:
+                if self._pending_droppable is not None:
+                    self._queue.remove(self._pending_droppable)
+                    self._pending_droppable = None
+                    self.dropped += 1
+                    break
+                self._not_full.clear()
+                self._blocked_puts += 1
+                try:
+                    await self._not_full.wait()
+                finally:
+                    self._blocked_puts -= 1
+
+        self._sequence += 1
+        event.sequence = self._sequence
+        self._queue.append(event)
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._not_empty.set()
+
+    def discard_droppable(self):
+        """Drop the waiting droppable event, outdated by a state change."""
+        if self._pending_droppable is not None:
+            self._queue.remove(self._pending_droppable)
+            self._pending_droppable = None
+            self.dropped += 1
+            self._not_full.set()
+
+    def when_sent(self, callback):
+        """
+        Call `callback` once the events queued so far are sent or failed.
+        Droppable events are not waited for. Callbacks of a stopped queue
+        are never called.
+        """
+        self._callbacks.append((self._sequence, callback))
+        self._run_callbacks()
+
+    def _run_callbacks(self):
+        # At most one droppable event waits, the oldest other one is in the first two
+        pending = [
+            event.sequence
+            for event in (self._sending, *itertools.islice(self._queue, 2))
+            if event is not None and not event.droppable
+        ]
+        while self._callbacks and (not pending or self._callbacks[0][0] < pending[0]):
+            _, callback = self._callbacks.popleft()
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Event queue callback failed for {self.name}: {e}")
+
+    async def run(self):
+        """Send queued events one at a time, in order."""
+        while True:
+            if not self._queue:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+
+            event = self._queue.popleft()
+            if event is self._pending_droppable:
+                self._pending_droppable = None
+            self._not_full.set()
+
+            self._sending = event
+            try:
+                await event.send()
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Failed to send {event.kind} event for {self.name}: {e}")
+            self._sending = None
+            self._run_callbacks()
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "merged": self.merged,
+            "dropped": self.dropped,
+        }
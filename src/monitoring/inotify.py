@@ -0,0 +1,144 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o0004000
+
+# Everything that can mean "a log file in this directory changed or rotated"
+LOG_DIR_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_CREATE
+    | IN_DELETE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc():
+    """Load libc with the inotify symbols, or None when unavailable."""
+    for name in (ctypes.util.find_library("c"), None):
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            getattr(libc, "inotify_init1")
+            return libc
+        except (OSError, AttributeError):
+            continue
+    return None
+
+
+class Inotify:
+    """Minimal non-blocking inotify binding that can wake the asyncio loop."""
+
+    def __init__(self):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify is not available on this platform")
+
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self.changed = asyncio.Event()
+        self._pending = []
+        self._loop = None
+
+    @classmethod
+    def create(cls):
+        """Return an Inotify instance, or None to fall back to polling."""
+        try:
+            return cls()
+        except OSError as e:
+            logging.info(f"inotify unavailable, falling back to polling: {e}")
+            return None
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask=LOG_DIR_MASK):
+        """Watch a path, returning the watch descriptor."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd):
+        """Stop watching a descriptor returned by add_watch."""
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def attach(self, loop=None):
+        """Set the `changed` event whenever the kernel queues events."""
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop.add_reader(self.fd, self._on_readable)
+
+    def _on_readable(self):
+        self._pending.extend(self.read_events())
+        self.changed.set()
+
+    def pop_events(self):
+        """Return and forget the events collected since the last call."""
+        events, self._pending = self._pending, []
+        return events
+
+    def read_events(self):
+        """Drain queued events as (wd, mask, name) tuples."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\x00")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    async def wait(self, timeout):
+        """Wait until an event arrives or the timeout expires; True on event."""
+        # asyncio.wait rather than wait_for: on Python 3.11 wait_for can
+        # swallow a cancellation that races with the event being set
+        waiter = asyncio.ensure_future(self.changed.wait())
+        try:
+            done, _ = await asyncio.wait((waiter,), timeout=timeout)
+        finally:
+            waiter.cancel()
+            self.changed.clear()
+        return bool(done)
+
+    def close(self):
+        if self.fd < 0:
+            return
+        if self._loop is not None:
+            self._loop.remove_reader(self.fd)
+            self._loop = None
+        os.close(self.fd)
+        self.fd = -1
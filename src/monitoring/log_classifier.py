@@ -0,0 +1,216 @@
+import logging
+import re
+from typing import Optional
+
+import monitoring.death_messages as death_messages
+from monitoring.log_records import LogRecord
+
+_GROUP_RE = re.compile(r"\(\?P([<=])(\w+)")
+# Leading inline flags like (?i), only allowed at the start of a pattern
+_FLAGS_RE = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+class LogRule:
+    """
+    One classification rule: lines whose message matches `pattern` become
+    events of `kind`. The optional named groups `player` and `message` fill
+    the event; any other group ends up in `LogEvent.fields`. `title` is an
+    optional format string used to announce events of custom kinds.
+    """
+
+    __slots__ = ("kind", "pattern", "title", "regex", "groups")
+
+    def __init__(self, kind, pattern, title=None):
+        self.kind = kind
+        self.pattern = pattern
+        self.title = title
+        self.regex = re.compile(pattern)
+        self.groups = tuple(self.regex.groupindex)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a rule from a config.yaml entry: {event, pattern[, title]}"""
+        try:
+            return cls(config["event"], config["pattern"], config.get("title"))
+        except KeyError as e:
+            raise ValueError(f"Log rule {config} is missing {e}") from None
+        except re.error as e:
+            raise ValueError(f"Invalid pattern in log rule {config}: {e}") from None
+        except (TypeError, AttributeError):
+            raise ValueError(f"Log rule {config!r} is not a mapping") from None
+
+
+class LogEvent:
+    """`record` is the LogRecord the event was read from, when there is one"""
+
+    __slots__ = ("kind", "player", "message", "fields", "rule", "record")
+
+    def __init__(self, kind, player=None, message=None, fields=None, rule=None):
+        self.kind = kind
+        self.player = player
+        self.message = message
+        self.fields = fields or {}
+        self.rule = rule
+        self.record = None
+
+    def to_wire(self, rules):
+        """Compact JSON-able form, `rules` being the classifier's rule list"""
+        record = self.record
+        return [
+            self.kind,
+            self.player,
+            self.message,
+            self.fields or None,
+            rules.index(self.rule) if self.rule is not None else None,
+            [
+                record.line,
+                record.message,
+                record.timestamp,
+                record.thread,
+                record.level,
+                record.logger,
+                record.continuation,
+            ]
+            if record is not None
+            else None,
+        ]
+
+    @classmethod
+    def from_wire(cls, data, classifier):
+        """Event sent by to_wire from a classifier built with the same rules"""
+        kind, player, message, fields, rule, record = data
+        event = cls(
+            kind, player, message, fields, classifier.rules[rule] if rule is not None else None
+        )
+        if record is not None:
+            *header, continuation = record
+            event.record = LogRecord(*header)
+            event.record.continuation = continuation
+        return event
+
+    def __repr__(self):
+        return f"LogEvent({self.kind!r}, player={self.player!r}, message={self.message!r})"
+
+
+PLAYER = r"(?P<player>[A-Za-z0-9_]{1,16})"
+
+DEFAULT_RULES = [
+    # Chat first: a chat line quoting "joined the game" is still chat
+    LogRule("chat", r"^(?:\[Not Secure\] )?<" + PLAYER + r"> (?P<message>.*)$"),
+    LogRule("join", r"^" + PLAYER + r" joined the game$"),
+    LogRule("leave", r"^" + PLAYER + r" left the game$"),
+    LogRule(
+        "advancement",
+        r"^" + PLAYER + r" has (?:made the advancement|completed the challenge|reached the goal) \[(?P<message>.+)\]$",
+    ),
+    LogRule("ready", r"^Done \((?P<message>[^)]*)\)! For help, type"),
+    LogRule(
+        "lag",
+        r"^Can't keep up! Is the server overloaded\? Running (?P<message>\d+ms or \d+ ticks) behind",
+    ),
+    LogRule(
+        "crash",
+        r"^(?:This crash report has been saved to: (?P<message>.+)"
+        r"|Encountered an unexpected exception|Preparing crash report)",
+    ),
+]
+
+
+class LogClassifier:
+    """
+    Turns the message of a log line into a typed event in one pass.
+
+    Every rule is anchored at the start of the message, right after the log
+    header, and all of them are compiled into a single alternation: one
+    regex search classifies the line and `match.lastindex` tells which rule
+    matched. Lines no rule claims are then checked against the death
+    message database, so chat never pays for death matching.
+
+    Extra rules (from a container's `log_rules`) are tried before the
+    default ones. A rule that cannot be part of the alternation is logged
+    and left out, so one bad pattern never takes the container down.
+    """
+
+    def __init__(self, rules=(), detect_deaths=True):
+        self.rules = []
+        for rule in list(rules) + DEFAULT_RULES:
+            try:
+                re.compile(self._alternative(rule, "r_"))
+            except re.error as e:
+                logging.warning(f"Skipping log rule {rule.kind} ({rule.pattern!r}): {e}")
+                continue
+            self.rules.append(rule)
+        self.detect_deaths = detect_deaths
+        self._pattern, self._branches = self._compile(self.rules)
+
+    @classmethod
+    def from_config(cls, rule_configs=None):
+        rules = []
+        for config in rule_configs or []:
+            try:
+                rules.append(LogRule.from_config(config))
+            except ValueError as e:
+                logging.warning(f"{e}, skipping it")
+        return cls(rules)
+
+    @staticmethod
+    def _alternative(rule, prefix):
+        """The rule's pattern as one branch of the combined alternation"""
+        pattern = rule.pattern
+        # Global flags are only allowed at the very start, scope them instead
+        flags = _FLAGS_RE.match(pattern)
+        if flags:
+            return f"(?{flags.group(1)}:{LogClassifier._prefix_groups(pattern[flags.end():], prefix)})"
+        return f"(?:{LogClassifier._prefix_groups(pattern, prefix)})"
+
+    @staticmethod
+    def _prefix_groups(pattern, prefix):
+        # Named groups get a per-rule prefix so they can share one pattern
+        return _GROUP_RE.sub(lambda m: f"(?P{m.group(1)}{prefix}{m.group(2)}", pattern)
+
+    @staticmethod
+    def _compile(rules):
+        branches = {}
+        alternatives = []
+        group_index = 1
+        for index, rule in enumerate(rules):
+            prefix = f"r{index}_"
+            alternatives.append(LogClassifier._alternative(rule, prefix))
+            branches[group_index] = (
+                rule,
+                prefix + "player" if "player" in rule.groups else None,
+                prefix + "message" if "message" in rule.groups else None,
+                [(name, prefix + name) for name in rule.groups if name not in ("player", "message")],
+            )
+            group_index += 1 + rule.regex.groups
+
+        # Each alternative gets one wrapping group, closed last when it matches
+        combined = "|".join(f"({alternative})" for alternative in alternatives)
+        return re.compile(combined), branches
+
+    def classify(self, message) -> Optional[LogEvent]:
+        """Event of a log message (header stripped), None for other lines."""
+        if not message:
+            return None
+
+        match = self._pattern.match(message)
+        if match:
+            rule, player, text, fields = self._branches[match.lastindex]
+            return LogEvent(
+                rule.kind,
+                match.group(player) if player else None,
+                match.group(text) if text else None,
+                {name: match.group(group) for name, group in fields} if fields else None,
+                rule,
+            )
+
+        if self.detect_deaths:
+            death = death_messages.match_death_message(message)
+            if death:
+                return LogEvent(
+                    "death",
+                    player=death.victim,
+                    message=message[len(death.victim) + 1 :],
+                    fields={"category": death.category, "killer": death.killer, "item": death.item},
+                )
+        return None
@@ -1,15 +1,21 @@
 import asyncio
-import aiofiles
+import functools
 import os
 import logging
+import time
 
-import monitoring.death_messages as death_messages
+from metrics import LOG_EVENTS, LOG_LINES
 from messager import Messager
-from monitoring.turn_manager import TurnManager
+from monitoring.checkpoint_store import CheckpointStore
+from monitoring.docker_log_stream import DockerLogStream
+from monitoring.event_queue import EventQueue
+from monitoring.log_classifier import LogClassifier, LogEvent
+from monitoring.log_records import LogRecordParser
+from monitoring.log_tailer import LogTailer, read_rotated_tail
 
 
 class LogMonitor:
-    _unknown_player = "Unknown Player"
+    LOG_SOURCES = ("file", "docker")
 
     def __init__(
         self,
@@ -21,7 +27,18 @@ class LogMonitor:
         host,
         ready_event,
         messager: Messager,
+        catchup_max_lines=50,
+        roster=None,
+        log_rules=None,
+        log_format=None,
+        log_reader=None,
+        log_workers=None,
+        log_source="file",
+        docker_client=None,
+        event_queue=None,
     ):
+        if log_source not in self.LOG_SOURCES:
+            raise ValueError(f"Unknown log source {log_source}")
         self.update_interval = update_interval
         self.log_file = log_file
         self.channel = channel
@@ -31,6 +48,37 @@ class LogMonitor:
         self.ready_event = ready_event
         self.messager = messager
         self.monitoring = False
+        self.catchup_max_lines = catchup_max_lines
+        self.roster = roster
+        self.checkpoint_store = CheckpointStore(friendly_name)
+        self.event_queue = event_queue or EventQueue(friendly_name)
+        self.log_reader = log_reader
+        # Tail and classify in a worker process instead, see log_workers.py
+        self.log_workers = log_workers
+        # Read the container's output from the Docker API instead of log_file
+        self.log_source = log_source
+        self.docker_client = docker_client
+        self.tailer = None
+        self.log_stream = None
+        # (inode, offset) where this process stopped reading, None before
+        self.live_position = None
+        self.last_cycle = time.monotonic()
+        # (inode, offset) reported by the worker, None while it isn't following
+        self.worker_position = None
+        self.log_rules = log_rules
+        self.log_format = log_format
+        self.record_parser = LogRecordParser(log_format)
+        self.classifier = LogClassifier.from_config(log_rules)
+        self._event_handlers = {
+            "join": self.on_join,
+            "leave": self.on_leave,
+            "chat": self.on_chat,
+            "death": self.on_death,
+            "advancement": self.on_advancement,
+            "ready": self.on_ready,
+            "lag": self.on_lag,
+            "crash": self.on_crash,
+        }
 
     def set_docker_monitor(self, docker_monitor):
         """Set reference to docker monitor for communication"""
@@ -38,12 +86,21 @@ class LogMonitor:
 
     async def start_monitoring(self):
         """Start monitoring server logs"""
-        logging.info(f"Starting log monitoring for: {self.log_file} ({self.host})")
+        source = self.log_file if self.log_source == "file" else "Docker logs"
+        logging.info(f"Starting log monitoring for: {source} ({self.host})")
         self.monitoring = True
+        self.event_queue.start()
+
+        if self.log_source == "file" and self.log_workers is not None:
+            await self.log_workers.follow(self)
+            return
 
         while self.monitoring:
             try:
-                await self.monitor_log_file()
+                if self.log_source == "docker":
+                    await self.follow_docker_logs()
+                else:
+                    await self.monitor_log_file()
             except Exception as e:
                 logging.error(f"Log monitoring error: {e}")
                 await asyncio.sleep(5)  # Wait before retrying
@@ -51,178 +108,322 @@ class LogMonitor:
     def stop_monitoring(self):
         """Stop monitoring server logs"""
         self.monitoring = False
+        self.checkpoint_store.flush()
+        self.event_queue.stop()
 
     async def monitor_log_file(self):
         """Monitor a single log file cycle"""
+        self.last_cycle = time.monotonic()
         # Check if file exists
         if not os.path.exists(self.log_file):
             logging.warning(f"Log file {self.log_file} not found, waiting...")
             await asyncio.sleep(5)
             return
 
-        initial_stat = os.stat(self.log_file)
-        current_position = 0
-
-        async with aiofiles.open(self.log_file, mode="r") as f:
-            await f.seek(0, 2)
-            current_position = await f.tell()
+        tailer = self.tailer = LogTailer(self.log_file, reader=self.log_reader)
+        try:
+            backlog = await self.resume_tailer(tailer)
             logging.info(
-                f"Started monitoring from position {current_position} in {self.log_file} on host {self.host}"
+                f"Started monitoring from position {tailer.position} in {self.log_file} on host {self.host}"
             )
             if self.ready_event:
                 self.ready_event.set()
 
-            while self.monitoring:
-                try:
-                    current_stat = os.stat(self.log_file)
-
-                    if (
-                        current_stat.st_ino != initial_stat.st_ino
-                        or current_stat.st_size < current_position
-                    ):
-                        logging.info(
-                            f"Log file rotated, restarting monitoring... ({self.log_file}) on host {self.host}"
-                        )
-                        break
-
-                except FileNotFoundError:
-                    logging.warning(
-                        f"Log file disappeared, restarting monitoring... ({self.log_file}) on host {self.host}"
-                    )
-                    break
+            await self.handle_log_lines(backlog)
+            self.checkpoint(tailer.inode, tailer.offset)
 
-                try:
-                    line = await f.readline()
-                    if line is not None and line != "":
-                        current_position = await f.tell()
-                        logging.debug(f"{self.host}: {line}")
-                        logging.debug(self.channel)
-                        message, _ = self.cleanup_log_line(line)
-                        await self.process_log_line(message, line)
-                    else:
-                        await asyncio.sleep(1)
-                except Exception:
-                    # await asyncio.sleep(1)
-                    continue
-
-    async def process_log_line(self, clean_line, full_line=""):
-        """Process a single log line for events"""
-
-        if "joined the game" in clean_line:
-            player_name, _ = self.extract_player_name_and_message(clean_line)
-            logging.debug(f"Player joined detected: {player_name}")
-
-            await self.messager.send_embed(
-                title=f"{player_name} s'est connecté.",
-                footer=self.friendly_name,
-                color=0x00FF00,
-            )
+            async for lines in tailer.follow():
+                await self.handle_log_lines(lines)
+                self.checkpoint(tailer.inode, tailer.offset)
+                if not self.monitoring:
+                    break
 
-        elif "left the game" in clean_line:
-            player_name, _ = self.extract_player_name_and_message(clean_line)
-            await self.messager.send_embed(
-                title=f"{player_name} s'est déconnecté.",
-                footer=self.friendly_name,
-                color=0xFF0000,
-            )
-        elif self.is_chat_message(clean_line):
-            player_name, message = self.extract_player_name_and_message(clean_line)
-            if player_name.startswith("<") and player_name.endswith(">"):
-                player_name = player_name[1:-1]
-            await self.messager.send_embed(
-                title=f"{player_name}: ",
-                description=f"💬 {message}",
-                footer=self.friendly_name,
-                color=0xFFFFFF,
-            )
+            if tailer.rotated:
+                logging.info(
+                    f"Log file rotated, restarting monitoring... ({self.log_file}) on host {self.host}"
+                )
+        finally:
+            self.checkpoint_store.flush()
+            if tailer.inode is not None:
+                self.live_position = (tailer.inode, tailer.offset)
+            tailer.close()
+            self.tailer = None
+
+    async def follow_docker_logs(self):
+        """Feed the container's output from the Docker logs API to the line handler"""
+        stream = self.log_stream = DockerLogStream(
+            self.docker_client, self.host, self.checkpoint_store, self.catchup_max_lines
+        )
+        try:
+            async for lines in stream.follow():
+                if self.ready_event:
+                    self.ready_event.set()
+                await self.handle_log_lines(lines)
+                if stream.last_timestamp is not None:
+                    self.checkpoint(stream.container_id, stream.last_timestamp)
+                if not self.monitoring:
+                    break
+        finally:
+            self.checkpoint_store.flush()
+            self.log_stream = None
+
+    def checkpoint(self, inode, offset):
+        """
+        Save the position once the events read before it reached Discord,
+        so a restart replays those still waiting in the queue.
+        """
+        self.event_queue.when_sent(
+            functools.partial(self.checkpoint_store.update, inode, offset)
+        )
 
-        elif "Done (" in clean_line and "For help, type" in clean_line:
-            logging.info("Server startup complete detected from logs")
-            if self.docker_monitor:
-                self.docker_monitor.notify_server_ready()
-                # Remove this server from turn rotation since it's done starting
-                if self.docker_monitor.turn_manager:
-                    TurnManager.remove_manager(self.docker_monitor.turn_manager)
-                    logging.info(f"Removed {self.friendly_name} from turn rotation")
-
-            elapsed = (
-                asyncio.get_event_loop().time()
-                - self.docker_monitor.turn_manager.start_time
+    @property
+    def following(self):
+        """Whether the log is open and followed, here or in a worker"""
+        if self.log_stream is not None:
+            return self.log_stream.connected
+        if self.log_source == "file" and self.log_workers is not None:
+            return self.worker_position is not None
+        return self.tailer is not None
+
+    def position(self):
+        """(inode, offset) of the first line not read yet, None if not following"""
+        if self.log_source == "file" and self.log_workers is not None:
+            return self.worker_position
+        tailer = self.tailer
+        return (tailer.inode, tailer.offset) if tailer is not None else None
+
+    def heartbeat_age(self):
+        """Seconds since the monitoring loop last showed signs of life"""
+        source = self.tailer or self.log_stream
+        last = source.heartbeat if source is not None else self.last_cycle
+        return time.monotonic() - last
+
+    def tail_lag(self):
+        """Bytes written to the log file that were not read yet"""
+        if self.log_source != "file":
+            # The daemon pushes lines as they are written
+            return 0
+        position = self.position()
+        try:
+            stat = os.stat(self.log_file)
+        except OSError:
+            return 0
+        if position is None or position[0] != stat.st_ino:
+            return stat.st_size
+        return max(0, stat.st_size - position[1])
+
+    async def resume_tailer(self, tailer):
+        """
+        Open the tailer where the last checkpoint stopped and return the lines
+        written since then, capped to the last `catchup_max_lines` lines.
+        Without a checkpoint, or with catch-up disabled, start at the end.
+
+        That is for a cold start only. After a rotation seen by this process
+        the new file is read from its start, every line of it, and any other
+        reopening continues from the exact position it stopped at.
+        """
+        if self.live_position is not None:
+            inode, offset = self.live_position
+            current = os.stat(self.log_file)
+            if current.st_ino != inode or offset > current.st_size:
+                offset = 0
+            tailer.open(offset)
+            return []
+
+        store = self.checkpoint_store
+        if store.inode is None:
+            store.load()
+
+        if store.inode is None or self.catchup_max_lines <= 0:
+            tailer.open()
+            return []
+
+        rotated_lines, rotated_total = [], 0
+        current = os.stat(self.log_file)
+        if current.st_ino == store.inode:
+            # Start over if the file was truncated below the saved offset
+            tailer.open(store.offset if store.offset <= current.st_size else 0)
+        else:
+            rotated_lines, rotated_total = await asyncio.get_running_loop().run_in_executor(
+                None,
+                read_rotated_tail,
+                self.log_file,
+                store.offset,
+                store.updated_at,
+                self.catchup_max_lines,
             )
+            tailer.open(0)
 
-            await self.messager.send_embed(
-                title="Le serveur est prêt.",
-                description=f"Prêt après {elapsed:.1f}s",
-                footer=self.friendly_name,
-                color=0x00FF00,
-                keep=True,
+        lines, total = await tailer.catch_up(self.catchup_max_lines)
+        backlog = (rotated_lines + lines)[-self.catchup_max_lines :]
+        skipped = rotated_total + total - len(backlog)
+        if skipped:
+            logging.info(
+                f"Skipped {skipped} backlog lines for {self.friendly_name}, replaying the last {len(backlog)}"
             )
+        return backlog
 
-            self.messager.clear_kept_messages()
-            logging.info("Server ready notification sent directly")
+    async def handle_log_lines(self, lines):
+        """Parse and process a batch of raw lines read from the log file"""
+        LOG_LINES.inc(len(lines), container=self.friendly_name)
+        for record in self.record_parser.parse(lines):
+            logging.debug(f"{self.host}: {record.line}")
+            try:
+                await self.process_record(record)
+            except Exception as e:
+                logging.debug(f"Skipped log line on {self.host}: {e}")
 
-        elif death_messages.is_death_message(clean_line):
-            player_name, message = self.extract_player_name_and_message(clean_line)
-            await self.messager.send_embed(
-                title=f"💀 {player_name} est mort: ",
-                description=f"{player_name} {message}",
-                footer=self.friendly_name,
-                color=0x000000,
-            )
+    async def process_record(self, record):
+        """Classify a log record once and dispatch its event"""
+        event = self.classifier.classify(record.message)
+        if event is not None:
+            event.record = record
+            await self.dispatch_event(event)
 
         # Handle startup log updates with sequential timing
         if self.docker_monitor.waiting_for_startup:
-            await self.handle_startup_update(full_line)
+            await self.handle_startup_update(record.line)
+
+    async def dispatch_event(self, event):
+        LOG_EVENTS.inc(container=self.friendly_name, event=event.kind)
+        handler = self._event_handlers.get(event.kind, self.on_custom_event)
+        await handler(event)
+
+    async def handle_worker_message(self, message):
+        """Status and classified events sent by the log worker of this container"""
+        self.last_cycle = time.monotonic() - message.get("heartbeat_age", 0)
+        position = message.get("position")
+        self.worker_position = tuple(position) if position else None
+
+        if message["op"] == "ready" and self.ready_event:
+            self.ready_event.set()
+        elif message["op"] == "batch":
+            LOG_LINES.inc(message["lines"], container=self.friendly_name)
+            for data in message["events"]:
+                try:
+                    await self.dispatch_event(LogEvent.from_wire(data, self.classifier))
+                except Exception as e:
+                    logging.debug(f"Skipped log event on {self.host}: {e}")
+            # Only the latest line matters to the debounced startup embed
+            if self.docker_monitor.waiting_for_startup and message["last_line"]:
+                await self.handle_startup_update(message["last_line"])
+            # The worker only reads the checkpoint, the bot knows what was sent
+            if position:
+                self.checkpoint(*position)
+
+    async def on_join(self, event):
+        logging.debug(f"Player joined detected: {event.player}")
+        if self.roster is not None:
+            self.roster.join(event.player)
+        await self.queue_embed(
+            "join",
+            title=f"{event.player} s'est connecté.",
+            footer=self.friendly_name,
+            color=0x00FF00,
+        )
 
-    async def handle_startup_update(self, full_line):
-        if (
-            not self.docker_monitor.turn_manager.my_turn
-            or not TurnManager._can_send_updates
-        ):
+    async def on_leave(self, event):
+        if self.roster is not None:
+            self.roster.leave(event.player)
+        await self.queue_embed(
+            "leave",
+            title=f"{event.player} s'est déconnecté.",
+            footer=self.friendly_name,
+            color=0xFF0000,
+        )
+
+    async def on_chat(self, event):
+        await self.queue_embed(
+            "chat",
+            title=f"{event.player}: ",
+            description=f"💬 {event.message}",
+            footer=self.friendly_name,
+            color=0xFFFFFF,
+        )
+
+    async def on_death(self, event):
+        await self.queue_embed(
+            "death",
+            title=f"💀 {event.player} est mort: ",
+            description=f"{event.player} {event.message}",
+            footer=self.friendly_name,
+            color=0x000000,
+        )
+
+    async def on_advancement(self, event):
+        # Classified for the metrics, not announced on Discord
+        logging.info(f"{event.player} made the advancement [{event.message}] on {self.friendly_name}")
+
+    async def on_ready(self, event):
+        logging.info("Server startup complete detected from logs")
+        elapsed = self.docker_monitor.startup_elapsed()
+        self.docker_monitor.notify_server_ready()
+
+        await self.event_queue.put(
+            "ready", functools.partial(self.send_server_ready, elapsed)
+        )
+
+    async def on_lag(self, event):
+        # Too frequent on a struggling server to be posted, the metric is enough
+        logging.warning(f"Server {self.friendly_name} can't keep up: {event.message} behind")
+
+    async def on_crash(self, event):
+        record = event.record
+        logging.error(
+            f"Server {self.friendly_name} crashed: {record.text if record is not None else event.message}"
+        )
+
+    async def on_custom_event(self, event):
+        """Events of rules from the container configuration"""
+        rule = event.rule
+        if not rule.title:
             return
+        try:
+            title = rule.title.format(
+                player=event.player, message=event.message, **event.fields
+            )
+        except (KeyError, IndexError, ValueError) as e:
+            logging.warning(f"Invalid title for log rule {rule.kind} on {self.friendly_name}: {e}")
+            return
+        await self.queue_embed(
+            event.kind,
+            title=title,
+            description=event.message,
+            footer=self.friendly_name,
+            color=0x5865F2,
+        )
+
+    async def handle_startup_update(self, full_line):
+        # Only overwrites the pending embed state, Messager pushes the latest
+        # one at most once per interval
+        elapsed = self.docker_monitor.startup_elapsed()
+        await self.event_queue.put(
+            "startup",
+            functools.partial(
+                self.messager.debounce_embed,
+                title=f"Le serveur démarre... {elapsed:.1f}s",
+                description=full_line,
+                footer=self.friendly_name,
+                color=0xFFFF00,
+            ),
+            droppable=True,
+        )
 
-        elapsed = (
-            asyncio.get_event_loop().time()
-            - self.docker_monitor.turn_manager.start_time
+    async def queue_embed(self, kind, droppable=False, **embed):
+        """Queue an embed for the sender task instead of awaiting Discord"""
+        await self.event_queue.put(
+            kind, functools.partial(self.messager.send_embed, **embed), droppable
         )
+
+    async def send_server_ready(self, elapsed):
+        """Turn the kept startup embed into the ready message and release it"""
         await self.messager.send_embed(
-            title=f"Le serveur démarre... {elapsed:.1f}s",
-            description=full_line,
+            title="Le serveur est prêt.",
+            description=f"Prêt après {elapsed:.1f}s",
             footer=self.friendly_name,
-            color=0xFFFF00,
+            color=0x00FF00,
             keep=True,
         )
 
-        logging.debug(f"Startup update sent from {self.friendly_name}")
-        # Don't await - let it run in background so we don't block log reading
-        task = asyncio.create_task(TurnManager._update_current_turn())
-        # Store reference to prevent garbage collection (task will complete on its own)
-        task.add_done_callback(lambda t: None)
-
-    def is_chat_message(self, log_line):
-        """Check if the log line is a chat message"""
-        if death_messages.is_death_message(log_line):
-            return False
-
-        if log_line.startswith("<") and ">" in log_line:
-            return True
-        return False
-
-    def extract_player_name_and_message(self, log_line):
-        """Extract player name and message from log line"""
-        if log_line:
-            player_name = log_line.split()[0]
-            message = " ".join(log_line.split()[1:])
-            print(message)
-            return player_name, message
-        return self._unknown_player, None
-
-    def cleanup_log_line(self, log_line):
-        """Clean up log line by removing io infos"""
-
-        parts = str(log_line).strip().split(": ")
-        if len(parts) >= 2:
-            message = parts[1]
-            info = parts[0]
-            return message, info
-        return None, None
+        self.messager.clear_kept_messages()
+        logging.info("Server ready notification sent")
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import time
+
+from monitoring.inotify import IN_Q_OVERFLOW, Inotify
+
+
+def stat_files(paths):
+    """(inode, size) of each path, None for missing ones. Blocking."""
+    stats = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stats.append(None)
+            continue
+        stats.append((stat.st_ino, stat.st_size))
+    return stats
+
+
+class LogReader:
+    """
+    One change detector shared by every LogTailer, so following hundreds of
+    log files costs one inotify descriptor and one task instead of a polling
+    task per file.
+
+    Tailers subscribe once they opened their file and sleep until the reader
+    wakes them: right away when inotify reports a change in their directory,
+    otherwise when the periodic sweep sees their file grow, shrink or get
+    replaced. The sweep stats every file in a single executor call; it also
+    catches what inotify misses on network and bind mounts, and it is the
+    only detection when inotify is unavailable, every `poll_interval`.
+    """
+
+    def __init__(self, use_inotify=True, poll_interval=1.0, sweep_interval=10.0):
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
+        self.sweep_interval = sweep_interval
+        self.tailers = set()
+        self.wakeups = 0
+        self.sweeps = 0
+        # Directory -> file name -> tailers, and the watches of the directories
+        self._by_directory = {}
+        self._watches = {}
+        self._directories = {}
+        self._inotify = None
+        self._task = None
+
+    def subscribe(self, tailer):
+        """Wake `tailer` whenever its file probably changed"""
+        directory, name = os.path.split(os.path.abspath(tailer.path))
+        self.tailers.add(tailer)
+        self._by_directory.setdefault(directory, {}).setdefault(name, set()).add(tailer)
+        if self._task is None or self._task.done():
+            self._start()
+        elif self._inotify is not None:
+            self._watch(directory)
+
+    def unsubscribe(self, tailer):
+        self.tailers.discard(tailer)
+        directory, name = os.path.split(os.path.abspath(tailer.path))
+        names = self._by_directory.get(directory, {})
+        group = names.get(name)
+        if group is not None:
+            group.discard(tailer)
+            if not group:
+                del names[name]
+        if not names and directory in self._by_directory:
+            del self._by_directory[directory]
+            self._unwatch(directory)
+
+    def _start(self):
+        if self.use_inotify and self._inotify is None:
+            self._inotify = Inotify.create()
+            if self._inotify is not None:
+                self._inotify.attach()
+                for directory in self._by_directory:
+                    self._watch(directory)
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+            self._directories.clear()
+
+    def _watch(self, directory):
+        if directory in self._directories:
+            return
+        try:
+            wd = self._inotify.add_watch(directory)
+        except OSError as e:
+            # The sweep still covers files of that directory
+            logging.warning(f"Cannot watch {directory}, relying on polling: {e}")
+            return
+        self._watches[wd] = directory
+        self._directories[directory] = wd
+
+    def _unwatch(self, directory):
+        wd = self._directories.pop(directory, None)
+        if wd is not None and self._inotify is not None:
+            self._watches.pop(wd, None)
+            self._inotify.rm_watch(wd)
+
+    def _wake(self, tailer):
+        if not tailer.wake.is_set():
+            self.wakeups += 1
+            tailer.wake.set()
+
+    def dispatch(self, events):
+        """Wake the tailers of the files named by inotify events"""
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, wake everybody
+                for tailer in self.tailers:
+                    self._wake(tailer)
+                return
+            names = self._by_directory.get(self._watches.get(wd), {})
+            if name:
+                tailers = names.get(name, ())
+            else:
+                # The directory itself moved or disappeared
+                tailers = [tailer for group in names.values() for tailer in group]
+            for tailer in tailers:
+                self._wake(tailer)
+
+    async def sweep(self):
+        """Stat every followed file and wake those that changed"""
+        self.sweeps += 1
+        tailers = list(self.tailers)
+        stats = await asyncio.get_running_loop().run_in_executor(
+            None, stat_files, [tailer.path for tailer in tailers]
+        )
+        now = time.monotonic()
+        for tailer, stat in zip(tailers, stats):
+            if stat is None or stat != (tailer.inode, tailer.position):
+                self._wake(tailer)
+            elif tailer.waiting:
+                # Idle and checked: the tailer is as alive as the reader
+                tailer.heartbeat = now
+
+    async def run(self):
+        logging.info(
+            f"Log reader started ({'inotify' if self._inotify else 'polling'})"
+        )
+        interval = self.sweep_interval if self._inotify else self.poll_interval
+        next_sweep = time.monotonic() + interval
+        while True:
+            timeout = max(0.0, next_sweep - time.monotonic())
+            if self._inotify:
+                await self._inotify.wait(timeout)
+                self.dispatch(self._inotify.pop_events())
+            else:
+                await asyncio.sleep(timeout)
+
+            if time.monotonic() >= next_sweep:
+                try:
+                    await self.sweep()
+                except Exception as e:
+                    logging.error(f"Log reader sweep failed: {e}")
+                next_sweep = time.monotonic() + interval
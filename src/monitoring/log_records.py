@@ -0,0 +1,139 @@
+import re
+
+# Header of each server's log4j layout, the message starts where they end
+LOG_FORMATS = {
+    # [12:00:00] [Server thread/INFO]: message
+    "vanilla": re.compile(
+        r"\[(?P<timestamp>\d{2}:\d{2}:\d{2})\] \[(?P<thread>[^\]]*)/(?P<level>[A-Z]+)\]: "
+    ),
+    # [12:00:00] [Server thread/INFO] (Minecraft) message
+    "fabric": re.compile(
+        r"\[(?P<timestamp>\d{2}:\d{2}:\d{2})\] \[(?P<thread>[^\]]*)/(?P<level>[A-Z]+)\] "
+        r"\((?P<logger>[^)]*)\) "
+    ),
+    # [18Jan2026 12:00:00.123] [Server thread/INFO] [minecraft/DedicatedServer/]: message
+    # and older Forge: [12:00:00] [Server thread/INFO] [minecraft/MinecraftServer]: message
+    "forge": re.compile(
+        r"\[(?P<timestamp>(?:\d{2}[A-Za-z]{3}\d{4} )?\d{2}:\d{2}:\d{2}(?:\.\d{3})?)\] "
+        r"\[(?P<thread>[^\]]*)/(?P<level>[A-Z]+)\] \[(?P<logger>[^\]]*?)/?\]: "
+    ),
+    # [12:00:00 INFO]: message, Paper's console layout
+    "paper": re.compile(r"\[(?P<timestamp>\d{2}:\d{2}:\d{2}) (?P<level>[A-Z]+)\]: "),
+}
+
+RECORD_FIELDS = ("timestamp", "thread", "level", "logger")
+
+
+class LogRecord:
+    """
+    One log entry. `line` is the raw first line; lines without a header
+    that follow it, like the frames of a stack trace, are kept in
+    `continuation`. Headerless lines that don't follow an entry become
+    records of their own, with only `message` set.
+    """
+
+    __slots__ = ("timestamp", "thread", "level", "logger", "message", "line", "continuation")
+
+    def __init__(self, line, message, timestamp=None, thread=None, level=None, logger=None):
+        self.line = line
+        self.message = message
+        self.timestamp = timestamp
+        self.thread = thread
+        self.level = level
+        self.logger = logger
+        self.continuation = None
+
+    @property
+    def text(self):
+        """The message with its continuation lines"""
+        if not self.continuation:
+            return self.message
+        return "\n".join([self.message, *self.continuation])
+
+    def __repr__(self):
+        return f"LogRecord({self.level!r}, {self.thread!r}, {self.message!r})"
+
+
+class LogRecordParser:
+    """
+    Turns raw log lines into LogRecords. The format is detected from the
+    first header that matches, and tried first afterwards, so a line costs
+    one anchored match unless the server changes layout.
+
+    A record keeps at most `max_continuation_lines` continuation lines, the
+    rest are replaced by a single "..." so a runaway trace can't grow it
+    without bound.
+    """
+
+    max_continuation_lines = 200
+
+    def __init__(self, log_format=None):
+        if log_format is not None and log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format {log_format}")
+        self.log_format = log_format
+        self._headers = self._order(log_format)
+        # Last record of the previous batch, headerless lines may continue it
+        self._last = None
+
+    @staticmethod
+    def _order(first):
+        # Group number of each record field in the header, 0 when it has none
+        headers = [
+            (log_format, header, tuple(header.groupindex.get(field, 0) for field in RECORD_FIELDS))
+            for log_format, header in LOG_FORMATS.items()
+        ]
+        if first is not None:
+            headers.sort(key=lambda item: item[0] != first)
+        return headers
+
+    def parse_line(self, line):
+        """Record of one line, None when it has no known header"""
+        for log_format, header, (timestamp, thread, level, logger) in self._headers:
+            match = header.match(line)
+            if match is None:
+                continue
+            if log_format != self.log_format:
+                self.log_format = log_format
+                self._headers = self._order(log_format)
+            groups = (None, *match.groups())
+            return LogRecord(
+                line,
+                line[match.end() :],
+                groups[timestamp],
+                groups[thread],
+                groups[level],
+                groups[logger],
+            )
+        return None
+
+    def parse(self, lines):
+        """
+        Records of a batch of lines, in order. A record is only yielded
+        once the next header or the end of the batch shows that it has no
+        more continuation lines, so a stack trace written in one go reaches
+        its record before it is handled. Continuation lines read in a later
+        batch are still attached to the previous record, but after it was
+        yielded.
+        """
+        pending = None
+        for line in lines:
+            record = self.parse_line(line)
+            if record is None:
+                previous = pending or self._last
+                if previous is not None and previous.level is not None:
+                    if previous.continuation is None:
+                        previous.continuation = []
+                    kept = len(previous.continuation)
+                    if kept < self.max_continuation_lines:
+                        previous.continuation.append(line)
+                    elif kept == self.max_continuation_lines:
+                        previous.continuation.append("...")
+                    continue
+                record = LogRecord(line, line)
+
+            if pending is not None:
+                yield pending
+            pending = self._last = record
+
+        if pending is not None:
+            yield pending
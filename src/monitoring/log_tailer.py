@@ -0,0 +1,225 @@
+import asyncio
+import glob
+import gzip
+import logging
+import os
+import re
+import time
+from collections import deque
+
+from monitoring.inotify import Inotify
+
+# Archives of latest.log, not Forge's debug-N.log.gz next to them
+ROTATED_LOG = re.compile(r"\d{4}-\d{2}-\d{2}-\d+\.log\.gz")
+
+
+class LogTailer:
+    """
+    Follow a growing log file by reading large chunks and splitting lines
+    in memory. Wakes up from inotify when available, otherwise from an
+    adaptive poll that tightens while the file is busy and backs off when idle.
+    With a shared LogReader, it sleeps until the reader wakes it instead.
+    """
+
+    chunk_size = 256 * 1024
+    min_poll_interval = 0.05
+    max_poll_interval = 1.0
+
+    def __init__(self, path, use_inotify=True, reader=None):
+        self.path = path
+        self.use_inotify = use_inotify
+        self.reader = reader
+        self.wake = asyncio.Event()
+        self.waiting = False
+        self.position = 0
+        self.inode = None
+        self.rotated = False
+        self.heartbeat = time.monotonic()
+        self._fd = None
+        self._buffer = b""
+        self._inotify = None
+        self._poll_interval = self.min_poll_interval
+
+    def open(self, position=None):
+        """Open the file at `position`, or at the end when not given."""
+        self._fd = os.open(self.path, os.O_RDONLY)
+        stat = os.fstat(self._fd)
+        self.inode = stat.st_ino
+        if position is None or position > stat.st_size:
+            position = stat.st_size
+        self.position = os.lseek(self._fd, position, os.SEEK_SET)
+        self._buffer = b""
+        self.rotated = False
+
+        if self.reader is not None:
+            self.reader.subscribe(self)
+        elif self.use_inotify:
+            self._inotify = Inotify.create()
+            if self._inotify:
+                self._inotify.add_watch(os.path.dirname(os.path.abspath(self.path)))
+                self._inotify.attach()
+
+    @property
+    def offset(self):
+        """Byte offset of the first line not handed out yet."""
+        return self.position - len(self._buffer)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.unsubscribe(self)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    async def _read_chunk(self):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, os.read, self._fd, self.chunk_size
+        )
+
+    async def read_available(self):
+        """Read every complete line written since the last call."""
+        lines = []
+        while True:
+            chunk = await self._read_chunk()
+            if not chunk:
+                break
+            self.position += len(chunk)
+            lines.extend(self._split(chunk))
+            if len(chunk) < self.chunk_size:
+                break
+        return lines
+
+    async def catch_up(self, max_lines):
+        """
+        Read up to the current end of file, keeping only the last `max_lines`
+        lines. Returns the kept lines and the total number of lines read.
+        """
+        lines = deque(maxlen=max_lines)
+        total = 0
+        while True:
+            chunk = await self._read_chunk()
+            if not chunk:
+                break
+            self.position += len(chunk)
+            complete = self._split(chunk)
+            total += len(complete)
+            lines.extend(complete)
+        return list(lines), total
+
+    def _split(self, chunk):
+        data = self._buffer + chunk
+        *complete, self._buffer = data.split(b"\n")
+        return [
+            line.rstrip(b"\r").decode("utf-8", errors="replace") for line in complete
+        ]
+
+    def flush_partial(self):
+        """Return the unterminated last line, if any, and forget it."""
+        if not self._buffer:
+            return []
+        line, self._buffer = self._buffer, b""
+        return [line.rstrip(b"\r").decode("utf-8", errors="replace")]
+
+    def check_rotation(self):
+        """
+        Same check as the original inode/size comparison: the path now points
+        to another file, the file shrank below our position or disappeared.
+        """
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            logging.warning(f"Log file disappeared ({self.path})")
+            return True
+
+        if current.st_ino != self.inode:
+            logging.info(f"Log file rotated ({self.path})")
+            return True
+        if current.st_size < self.position:
+            logging.info(f"Log file truncated ({self.path})")
+            return True
+        return False
+
+    async def wait_for_data(self):
+        """Sleep until the file probably changed."""
+        if self.reader is not None:
+            self.waiting = True
+            try:
+                await self.wake.wait()
+            finally:
+                self.waiting = False
+            self.wake.clear()
+            return
+
+        if self._inotify:
+            await self._inotify.wait(self.max_poll_interval)
+            self._inotify.pop_events()
+            return
+
+        await asyncio.sleep(self._poll_interval)
+        self._poll_interval = min(self._poll_interval * 2, self.max_poll_interval)
+
+    async def follow(self):
+        """
+        Yield batches of lines as they are written. Returns once the file was
+        rotated, after draining whatever was left in the old file.
+        """
+        while True:
+            self.heartbeat = time.monotonic()
+            lines = await self.read_available()
+            if lines:
+                self._poll_interval = self.min_poll_interval
+                yield lines
+                continue
+
+            if self.check_rotation():
+                self.rotated = True
+                # The old inode stays readable through our descriptor
+                lines = await self.read_available() + self.flush_partial()
+                if lines:
+                    yield lines
+                return
+
+            await self.wait_for_data()
+
+
+def read_rotated_tail(log_file, offset, since, max_lines):
+    """
+    Read what was appended to a log file after `offset` once it has been
+    rotated to `logs/YYYY-MM-DD-N.log.gz`. Archives modified after `since`
+    are read in order, the first one from `offset`. Blocking, run it in an
+    executor.
+    Returns the last `max_lines` lines and the total number of lines read.
+    """
+    directory = os.path.dirname(os.path.abspath(log_file))
+    archives = sorted(
+        (
+            path
+            for path in glob.glob(os.path.join(directory, "*.log.gz"))
+            if ROTATED_LOG.fullmatch(os.path.basename(path))
+            and (since is None or os.path.getmtime(path) >= since)
+        ),
+        key=os.path.getmtime,
+    )
+
+    lines = deque(maxlen=max_lines)
+    total = 0
+    for index, path in enumerate(archives):
+        try:
+            with gzip.open(path, "rb") as file:
+                if index == 0 and offset:
+                    file.seek(offset)
+                data = file.read()
+        except (OSError, EOFError) as e:
+            logging.warning(f"Could not read rotated log {path}: {e}")
+            continue
+
+        complete = [
+            line.rstrip(b"\r").decode("utf-8", errors="replace")
+            for line in data.splitlines()
+        ]
+        total += len(complete)
+        lines.extend(complete)
+    return list(lines), total
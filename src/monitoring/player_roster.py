@@ -0,0 +1,72 @@
+import logging
+import re
+import time
+
+
+class PlayerRoster:
+    """
+    Online players of one server, maintained from the join/leave lines of the
+    log, reset on container start/stop and reconciled against RCON `list`.
+    """
+
+    _list_response = re.compile(
+        r"There are (?P<count>\d+)(?: of a max of |/)(?P<max>\d+) players online:(?P<names>.*)",
+        re.DOTALL,
+    )
+
+    def __init__(self, name):
+        self.name = name
+        self._players = {}
+        self.max_players = None
+        self.synced = False
+        self.last_reconciled = None
+
+    @property
+    def players(self):
+        return sorted(self._players.values(), key=str.lower)
+
+    def __len__(self):
+        return len(self._players)
+
+    def __contains__(self, player_name):
+        return player_name.lower() in self._players
+
+    def join(self, player_name):
+        self._players[player_name.lower()] = player_name
+
+    def leave(self, player_name):
+        self._players.pop(player_name.lower(), None)
+
+    def reset(self):
+        """Nobody is online right after the server started or stopped."""
+        self._players.clear()
+        self.synced = True
+
+    def reconcile(self, list_response):
+        """Replace the roster with the output of RCON `list`, False if unparsable."""
+        match = self._list_response.search(list_response)
+        if not match:
+            logging.debug(f"Unexpected list response from {self.name}: {list_response}")
+            return False
+
+        names = [
+            name.strip()
+            for name in match.group("names").replace("\n", ",").split(",")
+            if name.strip()
+        ]
+        players = {name.lower(): name for name in names}
+        if self.synced and players.keys() != self._players.keys():
+            logging.info(
+                f"Roster of {self.name} drifted from RCON list: {self.players} -> {sorted(names, key=str.lower)}"
+            )
+
+        self._players = players
+        self.max_players = int(match.group("max"))
+        self.synced = True
+        self.last_reconciled = time.time()
+        return True
+
+    def matching(self, current):
+        """Players whose name contains `current`, for autocomplete."""
+        current = current.lower()
+        return [player for player in self.players if current in player.lower()]
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+
+import aiohttp
+
+from metrics import DISCORD_LATENCY, DISCORD_RATE_LIMITED
+
+_CHANNEL_ROUTE = re.compile(r"/channels/(\d+)/messages")
+_OPERATIONS = {"POST": "send", "PATCH": "edit", "DELETE": "delete"}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously, `capacity` tokens every `period`."""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self.tokens = min(
+            self.capacity, self.tokens + elapsed * self.capacity / self.period
+        )
+
+    def available(self, now=None):
+        now = now or time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return 0.0
+        return self.tokens
+
+    def try_take(self, now=None):
+        now = now or time.monotonic()
+        if self.available(now) >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self, now=None):
+        """Seconds until the next token is available."""
+        now = now or time.monotonic()
+        self._refill(now)
+        wait = max(0.0, (1 - self.tokens) * self.period / self.capacity)
+        return max(wait, self.blocked_until - now)
+
+    def is_full(self, now=None):
+        return self.available(now) >= self.capacity
+
+    def apply_rate_limit(self, limit, remaining, reset_after, now=None):
+        """Align the bucket with the rate limit Discord reported."""
+        now = now or time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining == 0 and reset_after:
+                self.blocked_until = max(self.blocked_until, now + reset_after)
+
+
+class ChannelScheduler:
+    """
+    Outbound budget of one Discord channel, shared by every container that
+    posts to it. Blocking sends are granted tokens round-robin per container;
+    optional updates (startup progress) only go out when the bucket keeps
+    `reserve` tokens for the others, and the container that waited longest
+    goes first.
+    """
+
+    def __init__(
+        self, channel_id, capacity=5, period=5.0, reserve=2, stale_after=10.0
+    ):
+        self.channel_id = channel_id
+        self.bucket = TokenBucket(capacity, period)
+        self.reserve = reserve
+        self.stale_after = stale_after
+        self._waiters = OrderedDict()
+        self._timer = None
+        # key -> [last request, last grant] for optional updates
+        self._optional = {}
+        self.rate_limited = 0
+
+    @property
+    def idle(self):
+        return not self._waiters and not self._optional and self.bucket.is_full()
+
+    async def acquire(self, key):
+        """Wait for this container's turn to use one token."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        self._grant()
+        await future
+
+    def _grant(self):
+        self._timer = None
+        while self._waiters:
+            key, waiters = next(iter(self._waiters.items()))
+            while waiters and waiters[0].done():
+                waiters.popleft()
+            if not waiters:
+                del self._waiters[key]
+                continue
+            if not self.bucket.try_take():
+                break
+            waiters.popleft().set_result(None)
+            if waiters:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+
+        if self._waiters and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.bucket.delay(), self._grant
+            )
+
+    def can_send_update(self, key):
+        """
+        Whether an optional update from `key` should be sent now. Does not take
+        a token, the send itself goes through acquire().
+        """
+        now = time.monotonic()
+        self.prune(now)
+        state = self._optional.setdefault(key, [now, 0.0])
+        state[0] = now
+
+        if self._waiters or self.bucket.available(now) < 1 + self.reserve:
+            return False
+        if any(
+            other[1] < state[1] for other_key, other in self._optional.items()
+            if other_key != key
+        ):
+            return False
+
+        state[1] = now
+        return True
+
+    def release(self, key):
+        """Forget a container once it has nothing optional left to send."""
+        self._optional.pop(key, None)
+
+    def prune(self, now=None):
+        """Drop containers that stopped asking, e.g. a boot that never finished."""
+        now = now or time.monotonic()
+        for key, (last_request, _) in list(self._optional.items()):
+            if now - last_request > self.stale_after:
+                del self._optional[key]
+
+    def apply_headers(self, status, headers):
+        """Update the bucket from the X-RateLimit-* headers of a response."""
+        try:
+            limit = headers.get("X-RateLimit-Limit")
+            remaining = headers.get("X-RateLimit-Remaining")
+            limit = int(limit) if limit is not None else None
+            remaining = int(remaining) if remaining is not None else None
+            reset_after = float(headers.get("X-RateLimit-Reset-After") or 0)
+            retry_after = float(headers.get("Retry-After") or reset_after)
+        except ValueError:
+            return
+
+        if status == 429:
+            self.rate_limited += 1
+            remaining, reset_after = 0, retry_after
+            logging.warning(
+                f"Discord rate limited channel {self.channel_id} for {retry_after:.1f}s"
+            )
+        self.bucket.apply_rate_limit(limit, remaining, reset_after)
+
+
+class RateScheduler:
+    """
+    Per-channel outbound rate scheduling for Discord messages. Channel state
+    is created on first use and dropped again once it is idle.
+    """
+
+    def __init__(self, capacity=5, period=5.0, reserve=2):
+        self.capacity = capacity
+        self.period = period
+        self.reserve = reserve
+        self._channels = {}
+
+    def channel(self, channel_id):
+        scheduler = self._channels.get(channel_id)
+        if scheduler is None:
+            self._prune()
+            scheduler = ChannelScheduler(
+                channel_id, self.capacity, self.period, self.reserve
+            )
+            self._channels[channel_id] = scheduler
+        return scheduler
+
+    def _prune(self):
+        for channel_id, scheduler in list(self._channels.items()):
+            scheduler.prune()
+            if scheduler.idle:
+                del self._channels[channel_id]
+
+    async def acquire(self, channel_id, key):
+        await self.channel(channel_id).acquire(key)
+
+    def can_send_update(self, channel_id, key):
+        return self.channel(channel_id).can_send_update(key)
+
+    def release(self, channel_id, key):
+        scheduler = self._channels.get(channel_id)
+        if scheduler:
+            scheduler.release(key)
+            if scheduler.idle:
+                del self._channels[channel_id]
+
+    def trace_config(self):
+        """aiohttp trace hooks feeding Discord's rate limit headers back in."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        return trace_config
+
+    async def _on_request_start(self, session, context, params):
+        context.started_at = time.monotonic()
+
+    async def _on_request_end(self, session, context, params):
+        match = _CHANNEL_ROUTE.search(params.url.path)
+        if match:
+            status = params.response.status
+            self.channel(int(match.group(1))).apply_headers(
+                status, params.response.headers
+            )
+            operation = _OPERATIONS.get(params.method, params.method.lower())
+            DISCORD_LATENCY.observe(
+                time.monotonic() - context.started_at, operation=operation
+            )
+            if status == 429:
+                DISCORD_RATE_LIMITED.inc(channel=match.group(1))
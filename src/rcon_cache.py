@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+
+class RCONResponseCache:
+    """
+    Short-lived cache in front of read-only RCON commands.
+
+    Only commands listed in DEFAULT_TTLS or `ttls` (or followed by
+    arguments, e.g. "help tp" for "help") are cached, each with its own TTL.
+    `ttls` overrides the defaults command by command, a TTL of 0 or None
+    turns caching off for that command. Concurrent identical
+    requests share one in-flight call and the least recently used entries are
+    evicted past `maxsize`. Any other command bypasses the cache and, since
+    it may change what the cached commands return, invalidates it.
+    """
+
+    DEFAULT_TTLS = {
+        "list": 2.0,
+        "tick query": 5.0,
+        "help": 300.0,
+        "seed": 3600.0,
+    }
+
+    def __init__(self, ttls=None, maxsize=128):
+        ttls = {
+            self.normalize(command): ttl
+            for command, ttl in [*self.DEFAULT_TTLS.items(), *(ttls or {}).items()]
+        }
+        self.ttls = {command: float(ttl) for command, ttl in ttls.items() if ttl}
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    @staticmethod
+    def normalize(command):
+        return " ".join(command.lower().split())
+
+    def ttl_for(self, command):
+        """TTL of a command, None if it must not be cached."""
+        words = command.split(" ")
+        for length in range(len(words), 0, -1):
+            ttl = self.ttls.get(" ".join(words[:length]))
+            if ttl is not None:
+                return ttl
+        return None
+
+    def invalidate(self):
+        self._entries.clear()
+
+    async def get(self, command, fetch):
+        """Return the cached response of `command`, calling `fetch()` on a miss."""
+        key = self.normalize(command)
+        ttl = self.ttl_for(key)
+        if ttl is None:
+            self.invalidate()
+            return await fetch()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.shared += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        task = asyncio.ensure_future(fetch())
+        self._in_flight[key] = task
+        try:
+            response = await asyncio.shield(task)
+        finally:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+
+        if isinstance(response, str) and not response.startswith("❌"):
+            self._entries[key] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                logging.debug(f"Evicted cached RCON response for '{evicted}'")
+        return response
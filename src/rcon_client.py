@@ -1,114 +1,418 @@
-import socket
 import asyncio
+import functools
 import struct
 import logging
+import random
+import time
 
+from metrics import RCON_ERRORS, RCON_LATENCY
 
-class RCONClient:
-    def __init__(self, host, port, password):
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_AUTH = 3
+
+
+class RCONAuthError(Exception):
+    pass
+
+
+class RCONUnavailableError(ConnectionError):
+    """Raised while reconnection attempts are backing off."""
+
+
+class RCONConnectionClosed(ConnectionResetError):
+    """Raised for commands not sent yet when their connection closed."""
+
+
+class _PendingResponse:
+    __slots__ = ("request_id", "parts", "started", "future")
+
+    def __init__(self, loop):
+        self.request_id = None
+        self.parts = []
+        # Set by the first fragment, done once the whole response arrived
+        self.started = loop.create_future()
+        self.future = loop.create_future()
+
+
+class RCONConnection:
+    """
+    One authenticated RCON connection over asyncio streams.
+
+    Minecraft parses exactly one packet per socket read and drops the
+    connection when a read holds more, so commands are sent one at a time.
+    Once the first fragment of a response arrives, the server has read the
+    command and an empty SERVERDATA_RESPONSE_VALUE packet follows it; the
+    server answers it only after the last fragment, so its echo marks the
+    end of a multi-packet response. A reader task matches response packets
+    to requests by id.
+    """
+
+    def __init__(self, host, port, password, timeout=10):
         self.host = host
         self.port = port
         self.password = password
-        self.socket = None
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
         self.request_id = 0
+        self.last_used = 0.0
+        self._responses = {}
+        self._sentinels = {}
+        self._reader_task = None
+        self._lock = asyncio.Lock()
+        self._queued = 0
+
+    @property
+    def closed(self):
+        return self.writer is None or self.writer.is_closing()
+
+    @property
+    def in_flight(self):
+        """Commands running or waiting for their turn on this connection"""
+        return self._queued
 
-    async def connect(self):
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.settimeout(30)
-        await asyncio.get_event_loop().run_in_executor(
-            None, self.socket.connect, (self.host, self.port)
+    async def open(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
         )
-        return await self.authenticate()
+        try:
+            await asyncio.wait_for(self.authenticate(), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+        self.last_used = asyncio.get_running_loop().time()
+        self._reader_task = asyncio.create_task(self._read_responses())
+        logging.debug(f"RCON connection established to {self.host}:{self.port}")
 
     async def authenticate(self):
+        request_id = self._send_packet(SERVERDATA_AUTH, self.password)
+        await self.writer.drain()
+        while True:
+            response_id, packet_type, _ = await self._read_packet()
+            if packet_type != SERVERDATA_AUTH_RESPONSE:
+                # Some servers send an empty response value first
+                continue
+            if response_id == -1 or response_id != request_id:
+                raise RCONAuthError("Authentication failed")
+            return
+
+    async def _read_responses(self):
+        """Dispatch response packets to the requests waiting for them."""
         try:
-            auth_response = await self._send_packet(3, self.password)
-            if auth_response is None:
-                raise Exception("Authentication failed")
-            logging.debug("RCON connection established")
-            return True
+            while True:
+                response_id, _, body = await self._read_packet()
+                pending = self._responses.get(response_id)
+                if pending is not None:
+                    pending.parts.append(body)
+                    if not pending.started.done():
+                        pending.started.set_result(None)
+                    continue
+
+                pending = self._sentinels.pop(response_id, None)
+                if pending is not None:
+                    self._responses.pop(pending.request_id, None)
+                    if not pending.future.done():
+                        pending.future.set_result("".join(pending.parts))
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logging.error(f"RCON connection failed: {e}")
-            if self.socket:
-                self.socket.close()
-                self.socket = None
-            return False
+            self._fail_pending(e)
+            self.close()
 
-    async def send_command(self, command):
+    def _fail_pending(self, error):
+        for pending in {*self._responses.values(), *self._sentinels.values()}:
+            for future in (pending.started, pending.future):
+                if not future.done():
+                    future.set_exception(error)
+                    # Not awaited when the other one failed first
+                    future.exception()
+        self._sentinels.clear()
+        self._responses.clear()
+
+    async def _request(self, packet_type, data, timeout):
+        if self.closed:
+            raise RCONConnectionClosed("RCON connection is closed")
+
+        self._queued += 1
         try:
-            await self.connect()
-            response = await self._send_packet(2, command)
-            if response is not None:
-                self.disconnect()
-                logging.debug(f"RCON command executed: {command}")
-                return response
-            else:
-                self.disconnect()
-                error_msg = f"❌ Pas de réponse reçue pour la commande: `{command}`"
-                logging.error(f"RCON command failed - no response: {command}")
-                return error_msg
-        except ConnectionRefusedError as e:
-            self.disconnect()
-            error_msg = "❌ Connection refusée, le serveur est peut-être hors ligne"
-            logging.error(f"RCON connection refused for command '{command}': {e}")
-            return error_msg
-        except TimeoutError as e:
-            self.disconnect()
-            error_msg = "❌ Délai de connexion dépassé : le serveur ne répond pas"
-            logging.error(f"RCON timeout for command '{command}': {e}")
-            return error_msg
-        except OSError as e:
-            self.disconnect()
-            error_msg = f"❌ Erreur réseau : {str(e)}"
-            logging.error(f"RCON network error for command '{command}': {e}")
-            return error_msg
-        except Exception as e:
-            self.disconnect()
-            error_msg = f"❌ Erreur RCON : {str(e)}"
-            logging.error(f"RCON command failed '{command}': {e}")
-            return error_msg
+            async with self._lock:
+                if self.closed:
+                    raise RCONConnectionClosed("RCON connection is closed")
+                pending = _PendingResponse(asyncio.get_running_loop())
+                try:
+                    return await asyncio.wait_for(
+                        self._exchange(pending, packet_type, data), timeout or self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    # Unread bytes would reach the server with the next command
+                    self.close()
+                    raise
+                finally:
+                    self._responses.pop(pending.request_id, None)
+                    for sentinel_id, waiting in list(self._sentinels.items()):
+                        if waiting is pending:
+                            del self._sentinels[sentinel_id]
+        finally:
+            self._queued -= 1
+            self.last_used = asyncio.get_running_loop().time()
 
-    def disconnect(self):
-        if self.socket:
-            self.socket.close()
-            self.socket = None
+    async def _exchange(self, pending, packet_type, data):
+        if packet_type is not None:
+            pending.request_id = self._send_packet(packet_type, data)
+            self._responses[pending.request_id] = pending
+            await self.writer.drain()
+            # The server read the command, the sentinel is a read of its own
+            await pending.started
+        sentinel_id = self._send_packet(SERVERDATA_RESPONSE_VALUE, "")
+        self._sentinels[sentinel_id] = pending
+        await self.writer.drain()
+        return await pending.future
 
-    async def _send_packet(self, packet_type, data):
-        """Send RCON packet and receive response"""
-        if self.socket is None:
-            return None
+    async def execute(self, command, timeout=None):
+        """Run one command and return its reassembled response body."""
+        return await self._request(SERVERDATA_EXECCOMMAND, command, timeout)
 
-        self.request_id += 1
+    async def ping(self, timeout=None):
+        """
+        Round trip that runs nothing on the server: Minecraft answers unknown
+        packet types with an "Unknown request" response.
+        """
+        await self._request(None, None, timeout)
 
+    def _send_packet(self, packet_type, data):
+        self.request_id = self.request_id % 0x7FFFFFFF + 1
         data_bytes = data.encode("utf-8")
-        packet_size = len(data_bytes) + 10
         packet = (
-            struct.pack("<iii", packet_size, self.request_id, packet_type)
+            struct.pack("<iii", len(data_bytes) + 10, self.request_id, packet_type)
             + data_bytes
             + b"\x00\x00"
         )
+        self.writer.write(packet)
+        return self.request_id
+
+    async def _read_packet(self):
+        """Read exactly one packet: (request id, type, body)."""
+        (size,) = struct.unpack("<i", await self.reader.readexactly(4))
+        if size < 10:
+            raise ConnectionError(f"Invalid RCON packet size {size}")
+        payload = await self.reader.readexactly(size)
+        response_id, packet_type = struct.unpack("<ii", payload[:8])
+        body = payload[8:-2].decode("utf-8", errors="ignore")
+        return response_id, packet_type, body
 
-        await asyncio.get_event_loop().run_in_executor(None, self.socket.send, packet)
+    def close(self):
+        if self._reader_task is not None:
+            if self._reader_task is not asyncio.current_task():
+                self._reader_task.cancel()
+            self._reader_task = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
+        self._fail_pending(ConnectionResetError("RCON connection closed"))
 
-        response_data = await asyncio.get_event_loop().run_in_executor(
-            None, self.socket.recv, 4096
+
+class RCONClient:
+    """
+    RCON client keeping a small pool of authenticated connections per server.
+    Commands are queued on the least busy connection; idle connections
+    are pinged to stay alive and closed after a while, and failed connection
+    attempts back off exponentially.
+    """
+
+    def __init__(
+        self,
+        host,
+        port,
+        password,
+        pool_size=2,
+        command_timeout=10,
+        keepalive_interval=30,
+        idle_timeout=300,
+        max_backoff=60,
+        cache=None,
+    ):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.pool_size = pool_size
+        self.command_timeout = command_timeout
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.max_backoff = max_backoff
+        self.cache = cache
+        self._connections = []
+        self._connect_lock = asyncio.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._keepalive_task = None
+        self.last_success = None
+        self.last_error = None
+        self.last_error_message = None
+
+    async def _connect(self):
+        loop = asyncio.get_running_loop()
+        if loop.time() < self._retry_at:
+            raise RCONUnavailableError(
+                f"reconnecting in {self._retry_at - loop.time():.0f}s"
+            )
+
+        connection = RCONConnection(
+            self.host, self.port, self.password, self.command_timeout
         )
+        try:
+            await connection.open()
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            self._failures += 1
+            backoff = min(self.max_backoff, 2 ** (self._failures - 1))
+            self._retry_at = loop.time() + backoff * random.uniform(0.5, 1.0)
+            raise
+        self.reset_backoff()
+        return connection
 
-        if len(response_data) < 12:
-            return None
+    def reset_backoff(self):
+        """Allow an immediate reconnection, the server just (re)started."""
+        self._failures = 0
+        self._retry_at = 0.0
 
-        response_size, response_id, _ = struct.unpack("<iii", response_data[:12])
+    def _least_busy(self):
+        self._connections = [c for c in self._connections if not c.closed]
+        return min(self._connections, key=lambda c: c.in_flight, default=None)
 
-        if packet_type == 3 and response_id != self.request_id:
-            return None
+    async def _get_connection(self):
+        connection = self._least_busy()
+        if connection and (
+            connection.in_flight == 0 or len(self._connections) >= self.pool_size
+        ):
+            return connection
+
+        async with self._connect_lock:
+            connection = self._least_busy()
+            if connection and (
+                connection.in_flight == 0 or len(self._connections) >= self.pool_size
+            ):
+                return connection
+            try:
+                new_connection = await self._connect()
+            except Exception:
+                # Keep using a busy connection rather than failing the command
+                if connection:
+                    return connection
+                raise
+            self._connections.append(new_connection)
 
-        response_string = response_data[12 : 12 + response_size - 10].decode(
-            "utf-8", errors="ignore"
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+        return new_connection
+
+    async def _keepalive(self):
+        """Ping idle connections and close those unused for too long."""
+        while self._least_busy():
+            await asyncio.sleep(self.keepalive_interval)
+            now = asyncio.get_running_loop().time()
+            for connection in list(self._connections):
+                if connection.in_flight:
+                    continue
+                if now - connection.last_used > self.idle_timeout:
+                    connection.close()
+                    continue
+                try:
+                    await connection.ping(self.command_timeout)
+                except Exception as e:
+                    logging.debug(f"RCON keepalive failed for {self.host}: {e}")
+                    connection.close()
+
+    async def execute(self, command):
+        """Run a command on a pooled connection, raising on failure."""
+        started_at = time.monotonic()
+        try:
+            while True:
+                connection = await self._get_connection()
+                try:
+                    response = await connection.execute(command, self.command_timeout)
+                    break
+                except RCONConnectionClosed:
+                    # Closed while the command waited for its turn, it was not sent
+                    continue
+                except BaseException:
+                    connection.close()
+                    raise
+        except Exception as e:
+            RCON_ERRORS.inc(server=self.host, error=type(e).__name__)
+            self.last_error = time.time()
+            self.last_error_message = str(e) or type(e).__name__
+            raise
+        self.last_success = time.time()
+        RCON_LATENCY.observe(
+            time.monotonic() - started_at,
+            server=self.host,
+            command=command.split(" ", 1)[0].lower(),
         )
-        return response_string.strip()
+        return response
+
+    @property
+    def reachable(self):
+        """Whether the last command got an answer, None before the first one"""
+        if self.last_success is None and self.last_error is None:
+            return None
+        return (self.last_success or 0) >= (self.last_error or 0)
+
+    @property
+    def open_connections(self):
+        return len([c for c in self._connections if not c.closed])
+
+    async def send_command(self, command):
+        try:
+            response = await self.execute(command)
+            logging.debug(f"RCON command executed: {command}")
+            return response.strip()
+        except RCONUnavailableError as e:
+            error_msg = "❌ Connection refusée, le serveur est peut-être hors ligne"
+            logging.error(f"RCON unavailable for command '{command}': {e}")
+            return error_msg
+        except ConnectionRefusedError as e:
+            error_msg = "❌ Connection refusée, le serveur est peut-être hors ligne"
+            logging.error(f"RCON connection refused for command '{command}': {e}")
+            return error_msg
+        except RCONAuthError as e:
+            error_msg = "❌ Authentification RCON refusée"
+            logging.error(f"RCON authentication failed for command '{command}': {e}")
+            return error_msg
+        except asyncio.TimeoutError as e:
+            error_msg = "❌ Délai de connexion dépassé : le serveur ne répond pas"
+            logging.error(f"RCON timeout for command '{command}': {e}")
+            return error_msg
+        except asyncio.IncompleteReadError as e:
+            error_msg = f"❌ Pas de réponse reçue pour la commande: `{command}`"
+            logging.error(f"RCON command failed - connection closed: {command}: {e}")
+            return error_msg
+        except OSError as e:
+            error_msg = f"❌ Erreur réseau : {str(e)}"
+            logging.error(f"RCON network error for command '{command}': {e}")
+            return error_msg
+        except Exception as e:
+            error_msg = f"❌ Erreur RCON : {str(e)}"
+            logging.error(f"RCON command failed '{command}': {e}")
+            return error_msg
+
+    def close(self):
+        """Close every pooled connection."""
+        if self._keepalive_task:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
 
     async def send_command_wrapper(self, *, command: str):
-        response = await self.send_command(command)
+        if self.cache:
+            response = await self.cache.get(
+                command, functools.partial(self.send_command, command)
+            )
+        else:
+            response = await self.send_command(command)
 
         if response.startswith("❌"):
             return response
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import socket
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from docker_client import DockerClient, DockerConnectionError, DockerNotFound  # noqa: E402
+from fake_docker_server import MAX_MESSAGE, FakeDockerServer  # noqa: E402
+from monitoring.checkpoint_store import CheckpointStore  # noqa: E402
+from monitoring.docker_log_stream import DockerLogStream  # noqa: E402
+
+
+def run(scenario):
+    """Run `scenario(server, client)` against a fake daemon with one container"""
+
+    async def main():
+        async with FakeDockerServer() as server:
+            server.add_container("mc")
+            client = DockerClient(server.base_url, timeout=5)
+            try:
+                return await asyncio.wait_for(scenario(server, client), 10)
+            finally:
+                await client.close()
+
+    return asyncio.run(main())
+
+
+def test_inspect():
+    async def scenario(server, client):
+        info = await client.inspect("mc")
+        assert info["Id"] == server.containers["mc"].id
+        assert info["State"]["Running"] is True
+
+    run(scenario)
+
+
+def test_inspect_unknown_container():
+    async def scenario(server, client):
+        with pytest.raises(DockerNotFound) as error:
+            await client.inspect("missing")
+        assert error.value.status == 404
+        assert "No such container" in error.value.message
+
+    run(scenario)
+
+
+def test_unreachable_daemon():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    async def main():
+        client = DockerClient(f"tcp://127.0.0.1:{port}", timeout=5)
+        try:
+            with pytest.raises(DockerConnectionError):
+                await client.restart("mc")
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_restart_sends_grace_period_and_events():
+    async def scenario(server, client):
+        async with client.events(filters={"type": ["container"]}) as events:
+            await client.restart("mc", timeout=42)
+            actions = [(await anext(events))["Action"] for _ in range(2)]
+        assert server.restarts == [("mc", 42)]
+        assert actions == ["die", "start"]
+
+    run(scenario)
+
+
+def test_events_since_replays():
+    async def scenario(server, client):
+        await server.set_running("mc", False)
+        since = server.events[0]["timeNano"]
+        seconds, nanos = divmod(since, 1_000_000_000)
+        async with client.events(since=f"{seconds}.{nanos:09d}") as events:
+            event = await anext(events)
+        assert event["Action"] == "die"
+        assert event["Actor"]["Attributes"]["name"] == "mc"
+
+    run(scenario)
+
+
+async def follow_lines(server, tmp_path, count):
+    stream = DockerLogStream(
+        DockerClient(server.base_url, timeout=5), "mc", CheckpointStore("mc", tmp_path)
+    )
+    lines = []
+    try:
+        async for batch in stream.follow():
+            if not batch and not lines:
+                # Established: write after the stream started at the end
+                for line in LINES:
+                    await server.write_log("mc", line)
+            lines.extend(batch)
+            if len(lines) >= count:
+                return lines, stream
+    finally:
+        await stream.client.close()
+
+
+LINES = [
+    "[12:00:00] [Server thread/INFO]: Steve joined the game",
+    "x" * (2 * MAX_MESSAGE + 100),
+    "[12:00:01] [Server thread/INFO]: Alex joined the game",
+]
+
+
+@pytest.mark.parametrize("tty", [False, True])
+def test_logs_are_demultiplexed(tmp_path, tty):
+    async def scenario(server, client):
+        server.containers["mc"].tty = tty
+        lines, stream = await follow_lines(server, tmp_path, len(LINES))
+        assert lines == LINES
+        assert stream.tty is tty
+        assert stream.last_timestamp == server.containers["mc"].logs[-1][0]
+
+    run(scenario)
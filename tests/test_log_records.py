@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from monitoring.log_records import LogRecordParser  # noqa: E402
+
+LAYOUTS = [
+    (
+        "vanilla",
+        "[12:00:00] [Server thread/INFO]: Steve joined the game",
+        ("12:00:00", "Server thread", "INFO", None),
+    ),
+    (
+        "fabric",
+        "[12:00:00] [Server thread/INFO] (Minecraft) Steve joined the game",
+        ("12:00:00", "Server thread", "INFO", "Minecraft"),
+    ),
+    (
+        "forge",
+        "[18Jan2026 12:00:00.123] [Server thread/INFO] [minecraft/DedicatedServer/]: "
+        "Steve joined the game",
+        ("18Jan2026 12:00:00.123", "Server thread", "INFO", "minecraft/DedicatedServer"),
+    ),
+    (
+        "forge",
+        "[12:00:00] [Server thread/INFO] [minecraft/MinecraftServer]: Steve joined the game",
+        ("12:00:00", "Server thread", "INFO", "minecraft/MinecraftServer"),
+    ),
+    (
+        "forge",
+        "[12:00:00] [Server thread/INFO] [minecraft]: Steve joined the game",
+        ("12:00:00", "Server thread", "INFO", "minecraft"),
+    ),
+    (
+        "paper",
+        "[12:00:00 INFO]: Steve joined the game",
+        ("12:00:00", None, "INFO", None),
+    ),
+]
+
+
+@pytest.mark.parametrize("log_format, line, header", LAYOUTS)
+def test_parse_line(log_format, line, header):
+    for parser in (LogRecordParser(), LogRecordParser(log_format)):
+        record = parser.parse_line(line)
+        assert record is not None
+        assert (record.timestamp, record.thread, record.level, record.logger) == header
+        assert record.message == "Steve joined the game"
+        assert parser.log_format == log_format
+
+
+def test_message_keeps_separators():
+    record = LogRecordParser().parse_line("[12:00:00] [Server thread/INFO]: <Steve> note: see: this")
+    assert record.message == "<Steve> note: see: this"
+
+
+def test_headerless_line():
+    parser = LogRecordParser()
+    assert parser.parse_line("\tat net.minecraft.server.Main.main(Main.java:1)") is None
+    (record,) = parser.parse(["Starting minecraft server"])
+    assert record.level is None
+    assert record.message == "Starting minecraft server"
+
+
+@pytest.mark.parametrize("log_format, line, header", LAYOUTS)
+def test_continuation_lines(log_format, line, header):
+    lines = [
+        line.replace("Steve joined the game", "Encountered an unexpected exception"),
+        "java.lang.NullPointerException: boom",
+        "\tat net.minecraft.server.Main.main(Main.java:1)",
+        line,
+    ]
+    crash, join = LogRecordParser().parse(lines)
+    assert crash.message == "Encountered an unexpected exception"
+    assert crash.continuation == lines[1:3]
+    assert crash.text == "\n".join([crash.message, *lines[1:3]])
+    assert join.message == "Steve joined the game"
+    assert join.continuation is None
+
+
+def test_continuation_across_batches():
+    parser = LogRecordParser()
+    (record,) = parser.parse(["[12:00:00] [Server thread/ERROR]: Exception in server tick loop"])
+    assert list(parser.parse(["\tat a.b(C.java:1)"])) == []
+    assert record.continuation == ["\tat a.b(C.java:1)"]
+
+
+def test_continuation_is_capped():
+    parser = LogRecordParser()
+    frames = [f"\tat a.b(C.java:{i})" for i in range(parser.max_continuation_lines + 50)]
+    (record,) = parser.parse(["[12:00:00] [Server thread/ERROR]: Exception in server tick loop"])
+    list(parser.parse(frames[:10]))
+    list(parser.parse(frames[10:]))
+    assert record.continuation == frames[: parser.max_continuation_lines] + ["..."]